@@ -0,0 +1,89 @@
+"""
+Request batching for the MCP compiler.
+
+LLM workers each ask for one server's metadata, but most of every prompt is
+the same block of rules. Batcher collects concurrent submissions per group
+for up to ``linger`` seconds (or until ``max_size`` are waiting) and hands
+them to ``run_batch`` in one go; each caller blocks until its own result is
+back. Whichever waiting caller flushes a batch runs it on its own thread.
+"""
+
+import threading
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class _Item:
+    def __init__(self, value: Any):
+        self.value = value
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class Batcher:
+    def __init__(
+        self,
+        run_batch: Callable[[Hashable, List[Any]], List[Any]],
+        max_size: int,
+        linger: float,
+    ):
+        self.run_batch = run_batch
+        self.max_size = max(1, max_size)
+        self.linger = linger
+        self._lock = threading.Lock()
+        self._pending: Dict[Hashable, List[_Item]] = {}
+        self.submitted = 0
+        self.batches = 0
+
+    def submit(self, group: Hashable, value: Any) -> Any:
+        """Queue ``value`` in ``group`` and block until its batch has run."""
+        item = _Item(value)
+        with self._lock:
+            self.submitted += 1
+            pending = self._pending.setdefault(group, [])
+            pending.append(item)
+            batch = self._take(group) if len(pending) >= self.max_size else None
+        if batch:
+            self._run(group, batch)
+
+        while not item.done.wait(self.linger):
+            # Nobody filled the batch in time: flush whatever is waiting
+            with self._lock:
+                waiting = item in self._pending.get(group, ())
+                batch = self._take(group) if waiting else None
+            if batch:
+                self._run(group, batch)
+
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _take(self, group: Hashable) -> List[_Item]:
+        pending = self._pending.get(group, [])
+        batch, rest = pending[: self.max_size], pending[self.max_size :]
+        if rest:
+            self._pending[group] = rest
+        else:
+            self._pending.pop(group, None)
+        self.batches += 1
+        return batch
+
+    def _run(self, group: Hashable, batch: List[_Item]):
+        try:
+            results = self.run_batch(group, [item.value for item in batch])
+            for item, result in zip(batch, results):
+                item.result = result
+        except BaseException as e:
+            for item in batch:
+                item.error = e
+        finally:
+            for item in batch:
+                item.done.set()
+
+    def summary(self) -> str:
+        with self._lock:
+            avg = self.submitted / self.batches if self.batches else 0.0
+            return (
+                f"{self.submitted} requests in {self.batches} batches "
+                f"(avg {avg:.1f} per batch)"
+            )
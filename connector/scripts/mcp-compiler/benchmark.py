@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Offline throughput benchmark for the MCP compiler.
+
+Starts standin_runtime.py in a child process, writes a synthetic registry of
+--servers entries to a scratch directory and runs phase 1 + phase 2 in this
+process against the stand-in, with the compiler's output and cache paths
+moved into the scratch directory so every run starts cold. Reports
+servers/sec, p50/p95 per pipeline stage and this process's peak RSS; the
+stand-in runs separately so its memory is not counted.
+
+Stand-in flags (--latency, --failure-rate, --llm-latency, ...) shape the fake
+Runtime and inference API; everything else goes to compiler.py's own parser.
+The client-side LLM rate limits still apply (LLM_RPS, LLM_TPM), so raise
+them in the environment when benchmarking something other than the limiter.
+
+Usage:
+    python benchmark.py --servers 500 [--latency 0.3 --latency-dist lognormal]
+                        [--failure-rate 0.1] [--rate-limit-rate 0.05]
+                        [--report bench.json] [compiler flags, e.g. --stream]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import resource
+import shutil
+import socket
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+from typing import Any, Dict
+
+from standin_runtime import add_arguments, config_from_args, serve
+
+STANDIN_STARTUP_TIMEOUT = 10.0
+TOPICS = [
+    "github",
+    "postgres",
+    "slack",
+    "weather",
+    "filesystem",
+    "notion",
+    "redis",
+    "browser",
+    "calendar",
+    "search",
+]
+
+# Module paths redirected into the scratch directory
+COMPILER_PATHS = [
+    "MCPCOMPILED_PATH",
+    "FAILEDSERVERS_PATH",
+    "PROGRESS_PATH",
+    "JOURNAL_PATH",
+    "LEDGER_PATH",
+    "CACHE_PATH",
+]
+
+
+def synthetic_registry(count: int, declared_credentials: float, seed: int) -> list:
+    """Registry entries shaped like registryRefined.json, npm first, some remote."""
+    rng = random.Random(seed)
+    servers = []
+    for i in range(count):
+        topic = TOPICS[i % len(TOPICS)]
+        slug = f"{topic}-mcp-{i}"
+        server: Dict[str, Any] = {
+            "registryId": f"bench-{i:06d}",
+            "origin": "mcp",
+            "name": f"{topic.title()} MCP Server {i}",
+            "namespace": "io.github.bench",
+            "slug": slug,
+            "description": f"MCP server for {topic} ({i}).",
+            "repoUrl": f"https://github.com/bench/{slug}",
+            "packages": [{"registryType": "npm", "identifier": f"@bench/{slug}"}],
+        }
+        if i % 2 == 0:
+            server["remotes"] = [
+                {"type": "streamable-http", "url": f"https://{slug}.bench.dev/mcp"}
+            ]
+        if rng.random() < declared_credentials:
+            server["environmentVariablesJsonSchema"] = [
+                {"name": f"{topic.upper()}_API_KEY", "isSecret": True, "isRequired": True}
+            ]
+        servers.append(server)
+    return servers
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for_standin(url: str):
+    deadline = time.monotonic() + STANDIN_STARTUP_TIMEOUT
+    while True:
+        try:
+            with urllib.request.urlopen(f"{url}/mcp/capabilities", timeout=1):
+                return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"Stand-in did not come up on {url}")
+            time.sleep(0.1)
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark the MCP compiler against a local stand-in",
+        epilog="Unrecognised flags are passed to compiler.py.",
+    )
+    parser.add_argument(
+        "--servers", type=int, default=200, help="Synthetic registry size"
+    )
+    parser.add_argument(
+        "--declared-credentials",
+        type=float,
+        default=0.05,
+        help="Share of registry entries that declare a secret (skip the spawn)",
+    )
+    parser.add_argument(
+        "--report", type=Path, default=None, help="Also write the report as JSON"
+    )
+    parser.add_argument(
+        "--keep", action="store_true", help="Keep the scratch directory"
+    )
+    add_arguments(parser)
+    args, compiler_argv = parser.parse_known_args()
+
+    config = config_from_args(args)
+    seed = args.seed if args.seed is not None else 0
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    workdir = Path(tempfile.mkdtemp(prefix="mcp-bench-"))
+    standin = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(config, "127.0.0.1", port), daemon=True
+    )
+    standin.start()
+    try:
+        wait_for_standin(url)
+
+        # Read at import time by runtime_client and llm_service
+        os.environ["RUNTIME_URL"] = url
+        os.environ["ASI_BASE_URL"] = f"{url}/v1"
+        os.environ.setdefault("ASI_INFERENCE_API_KEY", "standin")
+        import compiler
+
+        registry_path = workdir / "registryRefined.json"
+        registry = synthetic_registry(args.servers, args.declared_credentials, seed)
+        registry_path.write_text(json.dumps({"servers": registry}))
+        compiler.REGISTRY_REFINED_PATH = registry_path
+        for name in COMPILER_PATHS:
+            setattr(compiler, name, workdir / getattr(compiler, name).name)
+
+        compiler_args = compiler.build_parser().parse_args(compiler_argv)
+        mcp_compiler = compiler.compiler_from_args(compiler_args)
+        mcp_compiler.load_servers()
+        started = time.monotonic()
+        mcp_compiler.run_all(
+            compiler_args.limit,
+            False,
+            compiler_args.workers,
+            compiler_args.spawn_workers,
+        )
+        elapsed = time.monotonic() - started
+
+        with urllib.request.urlopen(f"{url}/stats", timeout=5) as response:
+            standin_stats = json.load(response)
+    finally:
+        standin.terminate()
+        standin.join()
+
+    processed = mcp_compiler.progress.processed
+    stages: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for label, timings in mcp_compiler.phase_timings.items():
+        stages[label] = {
+            stage: {
+                "count": len(samples),
+                "p50": timings.percentile(stage, 0.5),
+                "p95": timings.percentile(stage, 0.95),
+            }
+            for stage, samples in timings.samples.items()
+            if samples
+        }
+    report = {
+        "servers": args.servers,
+        "processed": processed,
+        "compiled": len(mcp_compiler.compiled),
+        "failed": len(mcp_compiler.failed),
+        "elapsed_s": elapsed,
+        "servers_per_s": processed / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": stages,
+        "standin": standin_stats,
+        "standin_config": vars(config),
+        "compiler_argv": compiler_argv,
+    }
+
+    print("\n" + "=" * 60)
+    print("BENCHMARK")
+    print("=" * 60)
+    print(f"Servers: {processed} processed of {args.servers} in {elapsed:.1f}s")
+    print(f"Throughput: {report['servers_per_s']:.2f} servers/sec")
+    print(f"Compiled: {report['compiled']}, failed: {report['failed']}")
+    for label, per_stage in stages.items():
+        for stage, s in per_stage.items():
+            print(
+                f"{label} {stage}: p50 {s['p50']:.2f}s, p95 {s['p95']:.2f}s "
+                f"over {s['count']}"
+            )
+    print(f"Peak RSS: {report['peak_rss_mb']:.0f} MB")
+    print(f"Stand-in: {standin_stats}")
+
+    if args.report:
+        args.report.write_text(json.dumps(report, indent=2))
+        print(f"Report: {args.report}")
+    if args.keep:
+        print(f"Scratch directory: {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
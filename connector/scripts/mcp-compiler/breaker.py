@@ -0,0 +1,167 @@
+"""
+Circuit breakers for the MCP compiler.
+
+When one Runtime transport or one inference model is down, every server
+would otherwise pay the full timeout (or all retries plus a fallback) to
+find out. A breaker opens after ``threshold`` consecutive failures and
+short-circuits calls until ``cooldown`` seconds have passed; then a single
+half-open probe decides whether it closes again or stays open. Every state
+change is kept for the run summary.
+"""
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+FAILURE_THRESHOLD = 5
+COOLDOWN_S = 60.0
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+# Tickets handed out by CircuitBreaker.allow()
+CALL = "call"
+PROBE = "probe"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+
+@dataclass
+class BreakerTransition:
+    at: float
+    name: str
+    old: str
+    new: str
+    reason: str
+
+    def __str__(self) -> str:
+        stamp = time.strftime("%H:%M:%S", time.localtime(self.at))
+        return f"{stamp} {self.name}: {self.old} -> {self.new} ({self.reason})"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        threshold: int = FAILURE_THRESHOLD,
+        cooldown: float = COOLDOWN_S,
+        on_transition=None,
+    ):
+        self.name = name
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.state = CLOSED
+        self.failures = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._on_transition = on_transition
+        self._lock = threading.Lock()
+
+    def _transition(self, state: str, reason: str):
+        old, self.state = self.state, state
+        if state == OPEN:
+            self._opened_at = time.monotonic()
+        if self._on_transition is not None:
+            self._on_transition(
+                BreakerTransition(time.time(), self.name, old, state, reason)
+            )
+
+    def _cooled_down(self) -> bool:
+        return time.monotonic() - self._opened_at >= self.cooldown
+
+    def available(self) -> bool:
+        """Whether a call would be let through, without claiming the probe."""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN:
+                return not self._probing
+            return self._cooled_down()
+
+    def allow(self) -> Optional[str]:
+        """Admit a call and return its ticket (CALL or PROBE), or None.
+
+        After the cooldown exactly one caller gets the PROBE ticket.
+        """
+        with self._lock:
+            if self.state == OPEN and self._cooled_down():
+                self._transition(HALF_OPEN, "cooldown elapsed, probing")
+            if self.state == CLOSED:
+                return CALL
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return PROBE
+            self.rejected += 1
+            return None
+
+    def record(self, ticket: str, ok: Optional[bool]):
+        """Report an admitted call: True/False, or None if it says nothing
+        about the dependency's health (cancelled, rate limited, bad input).
+
+        Only the probe decides a half-open breaker; calls admitted before
+        the breaker opened and finishing late are ignored.
+        """
+        with self._lock:
+            if ticket == PROBE:
+                self._probing = False
+                if ok is None or self.state != HALF_OPEN:
+                    return
+                if ok:
+                    self.failures = 0
+                    self._transition(CLOSED, "probe succeeded")
+                else:
+                    self._transition(OPEN, "probe failed")
+                return
+
+            if ok is None or self.state != CLOSED:
+                return
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.failures >= self.threshold:
+                self._transition(OPEN, f"{self.failures} consecutive failures")
+
+
+class BreakerRegistry:
+    """One breaker per key (transport or model), sharing a transition log."""
+
+    def __init__(
+        self,
+        scope: str,
+        threshold: int = FAILURE_THRESHOLD,
+        cooldown: float = COOLDOWN_S,
+    ):
+        self.scope = scope
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.transitions: List[BreakerTransition] = []
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _log(self, transition: BreakerTransition):
+        with self._lock:
+            self.transitions.append(transition)
+        print(f"[Breaker] {transition}")
+
+    def get(self, key: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(key)
+            if breaker is None:
+                breaker = self._breakers[key] = CircuitBreaker(
+                    f"{self.scope}:{key}", self.threshold, self.cooldown, self._log
+                )
+            return breaker
+
+    def summary(self) -> Dict[str, str]:
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            key: f"{b.state}, {b.rejected} calls short-circuited"
+            for key, b in breakers.items()
+        }
@@ -0,0 +1,135 @@
+"""
+Persistent SQLite caches for the MCP compiler.
+
+Each cache is one table of JSON values keyed by a content hash, stored under
+cache/ so it survives cleanup_output() and registry refreshes. Entries are
+evicted by age and by count (least recently used first), and every cache
+keeps hit/miss counters for the run summary.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+EVICT_EVERY = 500  # puts between eviction passes
+
+
+def content_key(*parts: Any) -> str:
+    """Stable sha256 over JSON-serializable parts."""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SqliteCache:
+    def __init__(
+        self,
+        path: Path,
+        table: str,
+        max_entries: int = 50000,
+        max_age_s: Optional[float] = None,
+    ):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.max_age_s = max_age_s
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self._puts_since_evict = 0
+        self._lock = threading.Lock()
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self._db.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)"
+        )
+        self._db.commit()
+        self.evict()
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_first([key])
+
+    def get_first(self, keys: List[str]) -> Optional[Any]:
+        """Return the first live entry among ``keys``; counts one hit or miss."""
+        now = time.time()
+        with self._lock:
+            for key in keys:
+                row = self._db.execute(
+                    f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None or (
+                    self.max_age_s is not None and now - row[1] > self.max_age_s
+                ):
+                    continue
+                self._db.execute(
+                    f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                    (now, key),
+                )
+                self._db.commit()
+                self.hits += 1
+                return json.loads(row[0])
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value: Any, created_at: Optional[float] = None):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                f"INSERT OR REPLACE INTO {self.table} "
+                "(key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), created_at or now, now),
+            )
+            self._db.commit()
+            self.writes += 1
+            self._puts_since_evict += 1
+            due = self._puts_since_evict >= EVICT_EVERY
+        if due:
+            self.evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+            self._db.commit()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used beyond max_entries."""
+        with self._lock:
+            if self.max_age_s is not None:
+                self._db.execute(
+                    f"DELETE FROM {self.table} WHERE created_at < ?",
+                    (time.time() - self.max_age_s,),
+                )
+            self._db.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at DESC "
+                "LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+            self._puts_since_evict = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (
+            f"{self.hits} hits, {self.misses} misses ({rate:.0%}), "
+            f"{self.writes} writes, {len(self)} entries"
+        )
+
+    def close(self):
+        with self._lock:
+            self._db.close()
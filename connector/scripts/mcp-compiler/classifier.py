@@ -0,0 +1,427 @@
+"""
+Rule-based fast path for MCP server metadata.
+
+Many servers are obvious from their tool names alone (``github_create_issue``,
+``postgres_query``), yet each one costs a chat completion. TagClassifier
+scores VALID_TAGS from a keyword index built once over the tag list plus a
+few aliases, weighting tool names over descriptions, and emits name,
+description and tags locally when one tag covers enough of the server and
+the registry already carries a human-written name. Anything ambiguous, named
+only by a slug, or phrased the way the LLM is told not to ("MCP server")
+returns None and goes to the LLM as before.
+"""
+
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+CLASSIFIER_THRESHOLD = float(os.environ.get("CLASSIFIER_THRESHOLD", "0.6"))
+MIN_TOOLS = 2  # a single tool is too little to go on
+
+# Per-source weight of one distinct tag hit
+TOOL_NAME_WEIGHT = 3.0
+TOOL_DESC_WEIGHT = 1.0
+NAME_WEIGHT = 2.0
+DESC_WEIGHT = 1.0
+SECONDARY_SHARE = 0.5  # other tags need this share of the top tag's score
+MIN_ACTION_CHARS = 4  # one-word actions shorter than this are fragments ("del")
+
+NAME_NOISE = ["MCP Server", "MCP", "Server", "| Glama", "| PulseMCP"]
+# Phrasing the LLM is told never to produce; local answers carrying it go there
+BANNED_PHRASING = re.compile(r"\bmcp\b", re.IGNORECASE)
+
+# Tokens that say nothing about the domain
+STOPWORDS = {
+    "mcp",
+    "server",
+    "servers",
+    "tool",
+    "tools",
+    "api",
+    "client",
+    "sdk",
+    "wrapper",
+    "helper",
+    "utility",
+    "utilities",
+    "the",
+    "and",
+    "for",
+    "with",
+    "model",
+    "context",
+    "protocol",
+    "js",
+    "py",
+    "ts",
+    "node",
+    "python",
+}
+
+# Leading tool-name words that only say what is done, not to what
+VERBS = {
+    "get",
+    "list",
+    "create",
+    "update",
+    "delete",
+    "remove",
+    "add",
+    "set",
+    "search",
+    "find",
+    "query",
+    "read",
+    "write",
+    "fetch",
+    "send",
+    "run",
+    "execute",
+    "start",
+    "stop",
+    "check",
+    "upload",
+    "download",
+    "post",
+    "put",
+    "patch",
+}
+
+# Spellings that the tag list itself does not contain
+ALIASES = {
+    "postgres": "postgresql",
+    "pg": "postgresql",
+    "mongo": "mongodb",
+    "k8s": "kubernetes",
+    "kubectl": "kubernetes",
+    "gmail": "email",
+    "smtp": "email",
+    "imap": "email",
+    "stripe": "payment",
+    "s3": "storage",
+    "bucket": "storage",
+    "tweet": "twitter",
+    "subreddit": "reddit",
+    "bitcoin": "crypto",
+    "ethereum": "blockchain",
+    "solana": "blockchain",
+    "scrape": "web-scraping",
+    "scraper": "web-scraping",
+    "crawl": "web-scraping",
+    "forecast": "weather",
+    "geocode": "geolocation",
+    "bash": "shell",
+    "spreadsheet": "excel",
+    "xlsx": "excel",
+    "embedding": "embeddings",
+}
+
+# Broader tag implied by a specific one, so single-domain servers get two tags
+RELATED = {
+    "github": "git",
+    "gitlab": "git",
+    "postgresql": "database",
+    "mysql": "database",
+    "mongodb": "database",
+    "redis": "database",
+    "sqlite": "database",
+    "elasticsearch": "search",
+    "qdrant": "vector-store",
+    "pinecone": "vector-store",
+    "weaviate": "vector-store",
+    "vector-store": "embeddings",
+    "slack": "messaging",
+    "discord": "chat",
+    "jira": "workflow",
+    "linear": "workflow",
+    "asana": "workflow",
+    "notion": "knowledge-base",
+    "confluence": "wiki",
+    "docker": "deployment",
+    "kubernetes": "orchestration",
+    "puppeteer": "browser",
+    "playwright": "browser",
+    "browser": "web-scraping",
+    "twitter": "social-media",
+    "linkedin": "social-media",
+    "instagram": "social-media",
+    "reddit": "social-media",
+    "youtube": "video",
+    "pdf": "document",
+    "excel": "document",
+    "csv": "document",
+    "markdown": "document",
+    "email": "messaging",
+    "sms": "messaging",
+    "payment": "billing",
+    "crypto": "blockchain",
+    "defi": "blockchain",
+    "nft": "blockchain",
+    "aws": "storage",
+    "shell": "terminal",
+    "terminal": "shell",
+    "filesystem": "storage",
+    "weather": "geolocation",
+    "maps": "geolocation",
+    "calendar": "scheduling",
+    "graphql": "http",
+    "rest": "http",
+}
+
+DISPLAY_NAMES = {
+    "github": "GitHub",
+    "gitlab": "GitLab",
+    "postgresql": "PostgreSQL",
+    "mysql": "MySQL",
+    "mongodb": "MongoDB",
+    "sqlite": "SQLite",
+    "graphql": "GraphQL",
+    "aws": "AWS",
+    "gcp": "GCP",
+    "youtube": "YouTube",
+    "linkedin": "LinkedIn",
+    "pdf": "PDF",
+    "csv": "CSV",
+    "json": "JSON",
+    "sms": "SMS",
+    "seo": "SEO",
+    "ocr": "OCR",
+    "nlp": "NLP",
+    "llm": "LLM",
+    "ai": "AI",
+    "rag": "RAG",
+    "nft": "NFT",
+    "crm": "CRM",
+    "http": "HTTP",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, splitting snake_case and kebab-case.
+
+    camelCase words are kept whole (``PostgreSQL``, ``GitHub``) and also
+    followed by their parts (``listIssues`` -> list, issues).
+    """
+    tokens = []
+    for word in re.split(r"[^A-Za-z0-9]+", text or ""):
+        if not word:
+            continue
+        tokens.append(word.lower())
+        parts = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", word).lower().split()
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+def display_name(name: str) -> str:
+    """Drop a registry namespace prefix (``io.github.owner/``, ``@scope/``)."""
+    prefix, slash, rest = name.rpartition("/")
+    if slash and rest and not re.search(r"\s", prefix):
+        return rest
+    return name
+
+
+def display_tag(tag: str) -> str:
+    """A tag as it reads in prose: ``redis`` -> Redis, ``github`` -> GitHub."""
+    return DISPLAY_NAMES.get(
+        tag, " ".join(DISPLAY_NAMES.get(w, w.capitalize()) for w in tag.split("-"))
+    )
+
+
+def clean_name(name: str) -> str:
+    """The same noise stripping _parse_json_response applies to LLM names."""
+    for phrase in NAME_NOISE:
+        name = re.sub(rf"\s*{re.escape(phrase)}\s*", " ", name, flags=re.IGNORECASE)
+    name = re.sub(r"\s+by\s+\S+", "", name, flags=re.IGNORECASE)
+    return " ".join(name.split()).strip()
+
+
+def build_keyword_index(valid_tags: Iterable[str]) -> Dict[str, str]:
+    """Keyword (single token or ``a-b`` bigram) -> tag."""
+    index: Dict[str, str] = {}
+    for tag in valid_tags:
+        index[tag] = tag
+        index[tag.replace("-", "")] = tag
+    for alias, tag in ALIASES.items():
+        index.setdefault(alias, tag)
+    return index
+
+
+class TagClassifier:
+    def __init__(
+        self,
+        valid_tags: Iterable[str],
+        banned_tags: Iterable[str] = (),
+        threshold: float = CLASSIFIER_THRESHOLD,
+        validate: Optional[Callable[[Dict[str, Any]], Optional[Dict]]] = None,
+    ):
+        self.valid_tags = set(valid_tags)
+        self.banned_tags = set(banned_tags)
+        self.threshold = threshold
+        # Local answers must pass the same checks as LLM answers
+        self.validate = validate
+        self.index = build_keyword_index(self.valid_tags)
+        self.attempted = 0
+        self.resolved = 0
+        self._lock = threading.Lock()
+
+    def tags_in(self, text: str) -> Set[str]:
+        tokens = [t for t in tokenize(text) if t not in STOPWORDS]
+        keys = tokens + [f"{a}-{b}" for a, b in zip(tokens, tokens[1:])]
+        keys += [k[:-1] for k in tokens if k.endswith("s") and len(k) > 3]
+        return {self.index[k] for k in keys if k in self.index}
+
+    def _pick_tags(self, scores: Dict[str, float]) -> List[str]:
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))
+        top_tag, top_score = ranked[0]
+        tags = [top_tag]
+        related = RELATED.get(top_tag)
+        if related in self.valid_tags:
+            tags.append(related)
+        for tag, score in ranked[1:]:
+            if score >= top_score * SECONDARY_SHARE and tag not in tags:
+                tags.append(tag)
+        return [t for t in tags if t not in self.banned_tags][:4]
+
+    @staticmethod
+    def _name(original_name: str) -> Optional[str]:
+        """The registry's own name once the noise is gone, or None when it
+        is only a slug or a single word: a title-cased slug ("Foo Tools") is
+        exactly what the LLM would improve on."""
+        name = display_name(original_name)
+        if not re.search(r"\s", name.strip()) or name == name.lower():
+            return None
+        name = clean_name(name)
+        if len(name.split()) < 2:
+            return None
+        return name[:60]
+
+    def _record(self, result: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if result is not None and (
+            not result["name"] or BANNED_PHRASING.search(result["description"])
+        ):
+            result = None
+        if result is not None and self.validate is not None:
+            result = self.validate(result)
+        with self._lock:
+            self.attempted += 1
+            self.resolved += int(result is not None)
+        return result
+
+    def classify_tools(
+        self,
+        original_name: str,
+        repo_url: str,
+        original_desc: str,
+        tools: List[Dict[str, Any]],
+    ) -> Optional[Dict[str, Any]]:
+        """Metadata for a spawned server, or None if its domain is unclear."""
+        if len(tools) < MIN_TOOLS:
+            return self._record(None)
+
+        scores: Dict[str, float] = defaultdict(float)
+        covered: Dict[str, int] = defaultdict(int)
+        for tool in tools:
+            name_tags = self.tags_in(str(tool.get("name", "")))
+            desc_tags = self.tags_in(str(tool.get("description", "")))
+            for tag in name_tags:
+                scores[tag] += TOOL_NAME_WEIGHT
+            for tag in desc_tags:
+                scores[tag] += TOOL_DESC_WEIGHT
+            for tag in name_tags | desc_tags:
+                covered[tag] += 1
+        name = display_name(original_name)
+        for tag in self.tags_in(f"{name} {repo_url.split('/')[-1]}"):
+            scores[tag] += NAME_WEIGHT
+        for tag in self.tags_in(original_desc):
+            scores[tag] += DESC_WEIGHT
+        if not scores:
+            return self._record(None)
+
+        tags = self._pick_tags(scores)
+        confidence = covered.get(tags[0], 0) / len(tools)
+        if confidence < self.threshold or len(tags) < 2:
+            return self._record(None)
+
+        top = tags[0]
+        actions = []
+        for tool in tools:
+            words = [
+                w
+                for w in tokenize(str(tool.get("name", "")))
+                if w not in STOPWORDS and self.index.get(w) != top
+            ]
+            # A bare verb ("get") or id suffix says nothing about the tool
+            if not any(w.isalpha() and w not in VERBS for w in words):
+                continue
+            if len(words) == 1 and len(words[0]) < MIN_ACTION_CHARS:
+                continue
+            action = " ".join(words)
+            if action not in actions:
+                actions.append(action)
+        description = f"Provides {len(tools)} {display_tag(top)} tools."
+        fallback = re.sub(
+            r"^MCP server:\s*", "", original_desc or "", flags=re.IGNORECASE
+        )
+        fallback = re.sub(r"\s+", " ", fallback).strip()
+        if not actions and len(fallback) >= 20:
+            description = fallback
+        elif actions:
+            shown = actions[:3]
+            listed = shown[0]
+            if len(shown) > 1:
+                listed = f"{', '.join(shown[:-1])} and {shown[-1]}"
+            description += f" Includes {listed}."
+        return self._record(
+            {
+                "name": self._name(original_name),
+                "description": description[:200],
+                "tags": tags,
+            }
+        )
+
+    def classify_repo(
+        self, original_name: str, repo_url: str, original_desc: str
+    ) -> Optional[Dict[str, Any]]:
+        """Metadata from the registry entry alone; requires at least
+        ``threshold`` of the meaningful name tokens to map to a tag and a
+        usable original description."""
+        repo_name = repo_url.rstrip("/").split("/")[-1] if repo_url else ""
+        name = display_name(original_name)
+        tokens = {t for t in tokenize(f"{name} {repo_name}") if t not in STOPWORDS}
+        desc = re.sub(r"^MCP server:\s*", "", original_desc or "", flags=re.IGNORECASE)
+        desc = re.sub(r"\s+", " ", desc).strip()
+        if not tokens or len(desc) < 20:
+            return self._record(None)
+
+        mapped = {t for t in tokens if self.tags_in(t)}
+        if len(mapped) / len(tokens) < self.threshold:
+            return self._record(None)
+
+        scores: Dict[str, float] = defaultdict(float)
+        for token in mapped:
+            for tag in self.tags_in(token):
+                scores[tag] += NAME_WEIGHT
+        for tag in self.tags_in(desc):
+            scores[tag] += DESC_WEIGHT
+        tags = self._pick_tags(scores)
+        if len(tags) < 2:
+            return self._record(None)
+
+        return self._record(
+            {
+                "name": self._name(original_name),
+                "description": desc[:200],
+                "tags": tags,
+            }
+        )
+
+    def summary(self) -> str:
+        with self._lock:
+            share = self.resolved / self.attempted if self.attempted else 0.0
+            return (
+                f"resolved {self.resolved}/{self.attempted} locally ({share:.0%}), "
+                f"threshold {self.threshold:g}"
+            )
@@ -6,13 +6,21 @@ Main orchestrator that:
 1. Spawns servers via Runtime API to discover tools
 2. Cleans metadata using LLM based on ACTUAL tool information
 3. Retries failed servers with different transports
-4. Runs in parallel with 3 models assigned to different batches
-5. Writes to mcpCompiled.json with checkpointing
+4. Runs as an asyncio pipeline (spawn -> LLM metadata -> record) where each
+   stage has its own bounded queue and concurrency, so slow Runtime spawns
+   never hold LLM capacity hostage
+5. Journals every result to output/journal.jsonl and materializes
+   mcpCompiled.json / failedServers.json at the end of each phase
+6. With --incremental, only compiles registry entries whose fingerprint
+   changed since the last output and drops entries that were removed
 
 Usage:
-    python compiler.py [--phase 1|2|all] [--limit N] [--workers N] [--resume]
+    python compiler.py [--phase 1|2|all] [--limit N] [--workers N]
+                       [--spawn-workers N] [--race] [--force-spawn] [--resume]
+                       [--incremental]
 """
 
+import asyncio
 import json
 import os
 import sys
@@ -21,14 +29,38 @@ import argparse
 import re
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Tuple, Callable, Set, Union
 from dataclasses import dataclass, asdict, field
-import requests
 from tqdm import tqdm
 from dotenv import load_dotenv
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import threading
 
+from breaker import BreakerRegistry, CircuitOpenError
+from cache import SqliteCache, content_key
+from concurrency import AIMDController, percentile
+from journal import CompileJournal, CompletionLedger, write_json_atomic
+from llm_service import (
+    CLIENTS,
+    LLM_BATCH_SIZE,
+    LLM_HEDGE_BUDGET,
+    RATE_LIMITS,
+    LLMService,
+)
+from runtime_client import (
+    HTTP_5XX_ERROR_CODE,
+    RUNTIME_URL,
+    SPAWN_BATCH_SIZE,
+    SPAWN_TIMEOUT,
+    ConnectionStats,
+    RuntimeClient,
+    is_overloaded,
+    is_runtime_failure,
+)
+from sessions import LiveSessions
+from singleflight import AsyncSingleFlight
+from timeouts import AdaptiveTimeouts
+
 load_dotenv()
 
 SCRIPT_DIR = Path(__file__).parent.absolute()
@@ -39,18 +71,75 @@ REGISTRY_REFINED_PATH = DATA_DIR / "registryRefined.json"
 MCPCOMPILED_PATH = OUTPUT_DIR / "mcpCompiled.json"
 FAILEDSERVERS_PATH = OUTPUT_DIR / "failedServers.json"
 PROGRESS_PATH = OUTPUT_DIR / "progress.json"
+JOURNAL_PATH = OUTPUT_DIR / "journal.jsonl"
+LEDGER_PATH = OUTPUT_DIR / "completed.jsonl"
+
+# Caches live outside output/ so they survive cleanup_output()
+CACHE_DIR = SCRIPT_DIR / "cache"
+CACHE_PATH = CACHE_DIR / "compiler.sqlite3"
+LLM_CACHE_MAX_ENTRIES = int(os.environ.get("LLM_CACHE_MAX_ENTRIES", "50000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.environ.get("LLM_CACHE_MAX_AGE_DAYS", "30"))
+TOOL_CACHE_TTL_HOURS = float(os.environ.get("TOOL_CACHE_TTL_HOURS", "24"))
+TOOL_CACHE_MAX_ENTRIES = int(os.environ.get("TOOL_CACHE_MAX_ENTRIES", "20000"))
+
+# Negative spawn cache: deterministic failures are skipped until their TTL
+# expires; timeouts only after repeated strikes, and with a shorter TTL
+NEGATIVE_CACHE_TTL_HOURS = float(os.environ.get("NEGATIVE_CACHE_TTL_HOURS", "72"))
+NEGATIVE_TIMEOUT_TTL_HOURS = float(os.environ.get("NEGATIVE_TIMEOUT_TTL_HOURS", "24"))
+NEGATIVE_TIMEOUT_STRIKES = 2
+
+PERMANENT_ERROR_CODES = {
+    "PACKAGE_NOT_FOUND",
+    "IMAGE_NOT_FOUND",
+    "INVALID_CONFIG",
+    "UNSUPPORTED_TRANSPORT",
+}
+PERMANENT_ERROR_PATTERN = re.compile(
+    r"E404|404 Not Found|is not in (?:the )?npm registry|No matching version"
+    r"|not found in (?:the )?(?:package )?registry|No solution found"
+    r"|manifest unknown|pull access denied|repository does not exist"
+    r"|invalid reference format|ENOTFOUND|Name or service not known",
+    re.IGNORECASE,
+)
+
+# Spawn config fields that decide which tools a server exposes
+SPAWN_KEY_FIELDS = (
+    "transport",
+    "package",
+    "command",
+    "args",
+    "remoteUrl",
+    "protocol",
+    "image",
+)
 
 CONNECTOR_URL = os.environ.get(
     "CONNECTOR_URL", "https://services.compose.market/connector"
 )
-RUNTIME_URL = os.environ.get("RUNTIME_URL", "https://runtime.compose.market")
-MANOWAR_INTERNAL_SECRET = os.environ.get("MANOWAR_INTERNAL_SECRET", "")
 
 CHECKPOINT_INTERVAL = 15
-SPAWN_TIMEOUT = 90  # Match Runtime's 60s + buffer
 BATCH_SIZE = 100
 NUM_MODELS = 3
 
+# Stage concurrency: spawns are I/O-bound waits on the Runtime, so many can be
+# in flight at once; LLM workers are bounded by the inference backends.
+SPAWN_WORKERS = int(os.environ.get("SPAWN_WORKERS", "24"))
+# Bounds for the adaptive spawn limit, which starts at SPAWN_WORKERS
+SPAWN_MIN_WORKERS = int(os.environ.get("SPAWN_MIN_WORKERS", "4"))
+SPAWN_MAX_WORKERS = int(os.environ.get("SPAWN_MAX_WORKERS", "96"))
+SPAWN_TARGET_P95 = float(os.environ.get("SPAWN_TARGET_P95", "30"))
+
+# Per-transport circuit breakers on Runtime failures (connection errors, 429/5xx)
+SPAWN_BREAKER_THRESHOLD = int(os.environ.get("SPAWN_BREAKER_THRESHOLD", "5"))
+SPAWN_BREAKER_COOLDOWN = float(os.environ.get("SPAWN_BREAKER_COOLDOWN", "120"))
+# Spawned sessions kept alive for reuse by identical spawn configs (0 = none)
+LIVE_SESSIONS = int(os.environ.get("LIVE_SESSIONS", "0"))
+
+# Failures worth another attempt in phase 2
+RETRYABLE_ERROR_CODES = {"LLM_ERROR", "LLM_CIRCUIT_OPEN", "CIRCUIT_OPEN"}
+LLM_WORKERS = int(os.environ.get("LLM_WORKERS", str(NUM_MODELS * 2)))
+QUEUE_DEPTH_FACTOR = 2
+
 TRANSPORT_PRIORITY = ["npx", "stdio", "http", "docker"]
 
 # Thread-safe locks
@@ -96,6 +185,7 @@ class CompiledServer:
     working_transport: str = ""
     spawn_failed: bool = False
     vars_required: dict = field(default_factory=dict)
+    fingerprint: str = ""
 
     def to_dict(self):
         d = {}
@@ -124,11 +214,28 @@ class FailedServer:
     transports_tried: list = field(default_factory=list)
     failed_at: str = ""
     retryable: bool = True
+    fingerprint: str = ""
 
     def to_dict(self):
         return asdict(self)
 
 
+@dataclass
+class ServerJob:
+    """A server moving through the pipeline, filled in stage by stage."""
+
+    server: dict
+    tools: list = field(default_factory=list)
+    config: dict = field(default_factory=dict)
+    transport: str = ""
+    vars_required: dict = field(default_factory=dict)
+    transports_tried: list = field(default_factory=list)
+    error: str = ""
+    error_code: str = ""
+    preflight: bool = False
+    queued_at: float = 0.0
+
+
 def detect_required_vars(error_msg: str) -> Dict[str, str]:
     """Extract vars_needed from Runtime error message.
 
@@ -174,6 +281,57 @@ def detect_required_vars(error_msg: str) -> Dict[str, str]:
     return vars_required
 
 
+def declared_required_vars(server: dict) -> Dict[str, str]:
+    """Read required variables from the registry's environmentVariablesJsonSchema.
+
+    The schema is either a list of ``{name, isSecret, isRequired, default}``
+    entries (mcp-registry raw) or a ``{name: {isSecret, ...}}`` mapping
+    (sync-mcp-registry output). Only variables marked ``isRequired`` without
+    a default cannot be satisfied by the Runtime, so spawning is a guaranteed
+    failure. ``isSecret`` alone does not gate: the registry defaults
+    ``isRequired`` to false and many optional API keys are secrets.
+    """
+    raw = server.get("raw", server)
+    schema = raw.get("environmentVariablesJsonSchema") or server.get(
+        "environmentVariablesJsonSchema"
+    )
+    if isinstance(schema, dict):
+        entries = [
+            {"name": name, **(spec if isinstance(spec, dict) else {})}
+            for name, spec in schema.items()
+        ]
+    elif isinstance(schema, list):
+        entries = [e for e in schema if isinstance(e, dict)]
+    else:
+        return {}
+
+    vars_required = {}
+    for entry in entries:
+        var_name = str(entry.get("name", "")).strip()
+        if not var_name:
+            continue
+        if entry.get("isRequired") is not True:
+            continue
+        if entry.get("default") or entry.get("value"):
+            continue
+        vars_required[var_name] = f"Required: {var_name}"
+    return vars_required
+
+
+def preflight_credentials(job: ServerJob) -> bool:
+    """Mark a job as credential-gated from its registry entry, without spawning."""
+    vars_required = declared_required_vars(job.server)
+    if not vars_required:
+        return False
+
+    configs = get_spawn_configs(job.server)
+    job.vars_required = vars_required
+    job.config = configs[0] if configs else {}
+    job.transport = job.config.get("transport", "")
+    job.preflight = True
+    return True
+
+
 def get_spawn_configs(server: dict) -> List[Dict[str, Any]]:
     """Get all possible spawn configurations for a server, ordered by priority."""
     configs = []
@@ -287,186 +445,539 @@ def get_spawn_configs(server: dict) -> List[Dict[str, Any]]:
     return unique_configs
 
 
-def spawn_server_via_runtime(
-    server_id: str, config: Optional[Dict] = None
-) -> Dict[str, Any]:
-    """Spawn server via Runtime API with optional config override."""
-    try:
-        url = f"{RUNTIME_URL}/mcp/spawn"
-        headers = {"Content-Type": "application/json"}
+def spawn_config_key(config: Dict[str, Any]) -> str:
+    """Content address of a resolved spawn config (package, args, URL, image)."""
+    return content_key({k: config.get(k) for k in SPAWN_KEY_FIELDS if config.get(k)})
+
+
+def spawn_fingerprint(server: dict) -> str:
+    """Hash of the registry fields that decide how a server is spawned."""
+    raw = server.get("raw", server)
+    return content_key(
+        raw.get("packages"),
+        raw.get("remotes"),
+        raw.get("remoteUrl") or server.get("remoteUrl"),
+        raw.get("image") or server.get("image"),
+        raw.get("version") or server.get("version"),
+    )
 
-        if MANOWAR_INTERNAL_SECRET:
-            headers["x-manowar-internal"] = MANOWAR_INTERNAL_SECRET
 
-        payload: Dict[str, Any] = {"serverId": server_id}
-        if config:
-            payload["config"] = config
+def registry_fingerprint(server: dict) -> str:
+    """Hash of everything in a registry entry that feeds its compiled record."""
+    raw = server.get("raw", server)
+    return content_key(
+        spawn_fingerprint(server),
+        server.get("name"),
+        server.get("description"),
+        raw.get("environmentVariablesJsonSchema")
+        or server.get("environmentVariablesJsonSchema"),
+    )
+
+
+def spawn_required_vars(error_code: str, error: str) -> Dict[str, str]:
+    """Required variables named by a spawn error.
+
+    A non-JSON 5xx body came from a proxy or an overloaded Runtime, not the
+    server, so it is never read as a credential request.
+    """
+    if error_code == HTTP_5XX_ERROR_CODE:
+        return {}
+    return detect_required_vars(error)
+
+
+def classify_spawn_error(error_code: str, error: str) -> str:
+    """Classify a spawn failure: credentials, permanent, timeout or transient."""
+    vars_required = spawn_required_vars(error_code, error)
+    if vars_required and not PERMANENT_ERROR_PATTERN.search(error):
+        return "credentials"
+    if error_code in PERMANENT_ERROR_CODES or PERMANENT_ERROR_PATTERN.search(error):
+        return "permanent"
+    if error_code == "TIMEOUT":
+        return "timeout"
+    return "transient"
+
+
+class SpawnFailureCache:
+    """Persistent record of spawn configs that fail deterministically.
+
+    Entries are keyed by registry ID and spawn config and carry the registry
+    fingerprint they were recorded against, so a changed entry is spawned
+    again straight away. Credential and transient errors are never recorded,
+    nor are spawns cut off by an adaptive timeout below the full budget.
+    """
+
+    def __init__(self, cache: SqliteCache):
+        self.cache = cache
+        self.skipped = 0
+
+    @staticmethod
+    def _key(registry_id: str, config: Dict[str, Any]) -> str:
+        return content_key(registry_id, spawn_config_key(config))
+
+    def lookup(
+        self, registry_id: str, config: Dict[str, Any], fingerprint: str
+    ) -> Optional[dict]:
+        """Return the recorded failure if this spawn should be skipped."""
+        entry = self.cache.get(self._key(registry_id, config))
+        if not entry or entry.get("fingerprint") != fingerprint:
+            return None
+        if time.time() > entry.get("expires_at", 0):
+            return None
+        if (
+            entry["error_class"] == "timeout"
+            and entry["count"] < NEGATIVE_TIMEOUT_STRIKES
+        ):
+            return None
+        self.skipped += 1
+        return entry
+
+    def record(
+        self,
+        registry_id: str,
+        config: Dict[str, Any],
+        fingerprint: str,
+        result: Dict[str, Any],
+    ):
+        if result.get("cutoff"):
+            return
+        error_code = result.get("error_code", "")
+        error = result.get("error", "")
+        error_class = classify_spawn_error(error_code, error)
+        if error_class not in ("permanent", "timeout"):
+            return
 
-        response = requests.post(
-            url,
-            json=payload,
-            headers=headers,
-            timeout=SPAWN_TIMEOUT,
+        key = self._key(registry_id, config)
+        now = time.time()
+        previous = self.cache.get(key) or {}
+        if previous.get("fingerprint") != fingerprint:
+            previous = {}
+        ttl_hours = (
+            NEGATIVE_CACHE_TTL_HOURS
+            if error_class == "permanent"
+            else NEGATIVE_TIMEOUT_TTL_HOURS
+        )
+        self.cache.put(
+            key,
+            {
+                "registryId": registry_id,
+                "transport": config.get("transport", ""),
+                "fingerprint": fingerprint,
+                "error_code": error_code,
+                "error": error,
+                "error_class": error_class,
+                "count": previous.get("count", 0) + 1,
+                "first_seen": previous.get("first_seen", now),
+                "last_seen": now,
+                "expires_at": now + ttl_hours * 3600,
+            },
         )
 
-        if response.status_code == 200:
-            data = response.json()
-            tools = data.get("tools", [])
-            return {
-                "success": True,
-                "sessionId": data.get("sessionId"),
-                "tools": tools,
-                "transport": config.get("transport")
-                if config
-                else data.get("transport", "unknown"),
-            }
+    def clear(self, registry_id: str, config: Dict[str, Any]):
+        self.cache.delete(self._key(registry_id, config))
+
+    def summary(self) -> str:
+        return f"{self.skipped} spawns skipped, {len(self.cache)} known failures"
+
+
+class Spawner:
+    """Spawn-stage front end for the Runtime.
+
+    Registry entries from different sources often resolve to the same
+    package, remote or image, so tool lists are cached by spawn config and
+    later entries with the same key get their tools without a spawn. Known
+    dead configs are answered from the failure cache with their recorded
+    error, so the job still ends up as a FailedServer. Concurrent spawns of
+    the same config share one Runtime request, and every Runtime request
+    waits for a slot from the adaptive concurrency controller. A transport
+    whose breaker is open fails fast with CIRCUIT_OPEN instead. Each attempt
+    gets its transport's adaptive timeout.
+
+    Sessions belong to the Spawner: once tools are captured the session is
+    released on the Runtime, or parked in ``live`` so a later duplicate can
+    list its tools without spawning. With the tool cache on, that duplicate
+    is answered from the cache instead, so nothing is parked and every
+    session is released straight away. ``close()`` releases whatever is left.
+    """
+
+    def __init__(
+        self,
+        runtime: RuntimeClient,
+        tool_cache: Optional[SqliteCache] = None,
+        failures: Optional[SpawnFailureCache] = None,
+        flights: Optional[AsyncSingleFlight] = None,
+        limiter: Optional[AIMDController] = None,
+        breakers: Optional[BreakerRegistry] = None,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+        live: Optional[LiveSessions] = None,
+    ):
+        self.runtime = runtime
+        self.tool_cache = tool_cache
+        self.failures = failures
+        self.flights = flights or AsyncSingleFlight()
+        self.limiter = limiter
+        self.breakers = breakers
+        self.timeouts = timeouts
+        self.live = live
+        self._releases: Set[asyncio.Future] = set()
+
+    async def spawn(
+        self, registry_id: str, config: Dict[str, Any], fingerprint: str = ""
+    ) -> Dict[str, Any]:
+        if self.failures is not None:
+            known = self.failures.lookup(registry_id, config, fingerprint)
+            if known:
+                return {
+                    "success": False,
+                    "error": known["error"],
+                    "error_code": known["error_code"],
+                    "tools": [],
+                    "cached": True,
+                }
+
+        key = spawn_config_key(config)
+        if self.tool_cache is not None:
+            tools = self.tool_cache.get(key)
+            if tools:
+                return {
+                    "success": True,
+                    "sessionId": None,
+                    "tools": tools,
+                    "transport": config.get("transport"),
+                    "cached": True,
+                }
+
+        if self.live is not None:
+            reused = await self._reuse(key, config)
+            if reused:
+                return reused
+
+        result, shared = await self.flights.do(
+            key, lambda: self._spawn_owned(registry_id, config, key)
+        )
+        if result.get("success") and result.get("tools"):
+            if self.tool_cache is not None and not shared:
+                self.tool_cache.put(key, result["tools"])
+            if self.failures is not None:
+                self.failures.clear(registry_id, config)
+        elif self.failures is not None and not result.get("success"):
+            self.failures.record(registry_id, config, fingerprint, result)
+        return result
+
+    async def _reuse(
+        self, key: str, config: Dict[str, Any]
+    ) -> Optional[Dict[str, Any]]:
+        session_id = self.live.checkout(key)
+        if not session_id:
+            return None
+        result = await self.runtime.list_tools(session_id)
+        if not (result.get("success") and result.get("tools")):
+            self._release_later(session_id)
+            return None
+        self.live.reused += 1
+        self._retire(key, session_id, park=True)
+        return {
+            "success": True,
+            "sessionId": None,
+            "tools": result["tools"],
+            "transport": config.get("transport"),
+            "reused": True,
+        }
+
+    async def _spawn_owned(
+        self, registry_id: str, config: Dict[str, Any], key: str
+    ) -> Dict[str, Any]:
+        # Runs inside the shared flight, so the session is retired even if
+        # every caller has been cancelled (e.g. a transport that lost a race)
+        result = await self._spawn_limited(registry_id, config)
+        session_id = result.get("sessionId")
+        if session_id:
+            result["sessionId"] = None
+            # A cached tool list answers the next duplicate before _reuse
+            # would, so a parked session would only hold Runtime capacity
+            park = self.tool_cache is None and bool(
+                result.get("success") and result.get("tools")
+            )
+            self._retire(key, session_id, park)
+        return result
+
+    def _retire(self, key: str, session_id: str, park: bool):
+        if park and self.live is not None:
+            released = self.live.park(key, session_id)
         else:
-            error_data = response.json()
-            if isinstance(error_data.get("error"), dict):
-                error_code = error_data["error"].get("code", "")
-                error_msg = error_data["error"].get("message", response.text)
-            else:
-                error_code = ""
-                error_msg = str(error_data.get("error", response.text))
+            released = [session_id]
+        for sid in released:
+            self._release_later(sid)
+
+    def _release_later(self, session_id: str):
+        task = asyncio.ensure_future(self.runtime.release(session_id))
+        self._releases.add(task)
+        task.add_done_callback(self._releases.discard)
+
+    async def close(self):
+        """Release parked sessions and wait for outstanding releases."""
+        if self.live is not None:
+            for session_id in self.live.drain():
+                self._release_later(session_id)
+        await asyncio.gather(*self._releases, return_exceptions=True)
+
+    async def _spawn_limited(
+        self, registry_id: str, config: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        transport = config.get("transport", "")
+        breaker = self.breakers.get(transport) if self.breakers else None
+        ticket = breaker.allow() if breaker is not None else None
+        if breaker is not None and not ticket:
             return {
                 "success": False,
-                "error": error_msg,
-                "error_code": error_code,
+                "error": f"Circuit open for {transport} transport",
+                "error_code": "CIRCUIT_OPEN",
                 "tools": [],
             }
 
-    except requests.Timeout:
-        return {
-            "success": False,
-            "error": f"Spawn timeout ({SPAWN_TIMEOUT}s)",
-            "error_code": "TIMEOUT",
-            "tools": [],
-        }
-    except requests.RequestException as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "error_code": "REQUEST_ERROR",
-            "tools": [],
-        }
-    except Exception as e:
-        return {
-            "success": False,
-            "error": str(e),
-            "error_code": "UNKNOWN",
-            "tools": [],
-        }
+        timeout = (
+            self.timeouts.timeout_for(transport) if self.timeouts else SPAWN_TIMEOUT
+        )
+        loop = asyncio.get_running_loop()
+        latency, result = None, {}
+        acquired = False
+        try:
+            # Waiting for a slot stays inside the try: a race loser cancelled
+            # here must still hand back its breaker ticket (the probe, maybe)
+            if self.limiter is not None:
+                await self.limiter.acquire()
+                acquired = True
+            started = loop.time()
+            result = await self.runtime.spawn(registry_id, config, timeout)
+            latency = loop.time() - started
+            if self.timeouts is not None:
+                if result.get("success"):
+                    self.timeouts.observe(transport, latency)
+                elif (
+                    timeout < self.timeouts.default
+                    and result.get("error_code") == "TIMEOUT"
+                ):
+                    # Cut off below the full budget: says nothing about a
+                    # slow cold start, so it is neither a strike nor a sample
+                    result["cutoff"] = True
+                    self.timeouts.record_cutoff(transport)
+            return result
+        finally:
+            if acquired:
+                self.limiter.release(
+                    None if result.get("cutoff") else latency, is_overloaded(result)
+                )
+            if breaker is not None:
+                # Package errors and per-server timeouts still prove the
+                # transport path is up
+                breaker.record(
+                    ticket, None if latency is None else not is_runtime_failure(result)
+                )
 
 
-def process_server_with_model(
-    args: Tuple,
-) -> Tuple[Optional[dict], Optional[dict], bool, str]:
-    """Process a single server with assigned model. Thread-safe."""
-    server, model_idx, backends = args
+async def discover_tools(
+    spawner: Spawner, job: ServerJob, race: bool = False
+) -> ServerJob:
+    """Spawn stage: find a transport that yields tools or credentials."""
+    if race:
+        return await race_transports(spawner, job)
 
-    from llm_service import LLMService
+    registry_id = job.server.get("registryId", "")
+    fingerprint = spawn_fingerprint(job.server)
 
-    registry_id = server.get("registryId", "")
-    original_name = server.get("name", "")
-    namespace = server.get("namespace", "")
-    original_desc = server.get("description", "")
-    repo_url = server.get("repoUrl", "")
+    for config in get_spawn_configs(job.server):
+        transport = config.get("transport", "")
+        job.transports_tried.append(transport)
 
-    backend = backends[model_idx % len(backends)]
-    llm = LLMService(backend["model"])
+        result = await spawner.spawn(registry_id, config, fingerprint)
 
-    spawn_configs = get_spawn_configs(server)
+        if result.get("success") and result.get("tools"):
+            job.tools = result.get("tools", [])
+            job.config = config
+            job.transport = transport
+            return job
 
-    transports_tried = []
-    last_error = ""
-    last_error_code = ""
+        job.error = result.get("error", "")
+        job.error_code = result.get("error_code", "")
 
-    for config in spawn_configs:
-        transport = config.get("transport", "")
-        transports_tried.append(transport)
+        vars_required = spawn_required_vars(job.error_code, job.error)
+        if vars_required:
+            job.vars_required = vars_required
+            job.config = config
+            job.transport = transport
+            return job
 
-        result = spawn_server_via_runtime(registry_id, config)
+    return job
 
-        if result.get("success") and result.get("tools"):
-            tools = result.get("tools", [])
 
-            llm_result = llm.clean_server_with_tools(
-                registry_id, original_name, namespace, repo_url, tools, backend
-            )
+async def race_transports(spawner: Spawner, job: ServerJob) -> ServerJob:
+    """Spawn every viable transport at once and keep the first one with tools.
 
-            if llm_result:
-                compiled = CompiledServer(
-                    id=registry_id,
-                    registryId=registry_id,
-                    name=llm_result.name,
-                    slug=server.get("slug", ""),
-                    description=llm_result.description,
-                    tags=llm_result.tags,
-                    transport=transport,
-                    tools=tools,
-                    tool_count=len(tools),
-                    spawn=config,
-                    source=server.get("source", ""),
-                    compiled_at=datetime.now(timezone.utc)
-                    .isoformat()
-                    .replace("+00:00", "Z"),
-                    working_transport=transport,
-                    spawn_failed=False,
-                )
-                return (
-                    compiled.to_dict(),
-                    None,
-                    True,
-                    f"SUCCESS ({transport}): {len(tools)} tools",
-                )
+    Pending spawns are cancelled as soon as a winner is found; the Spawner
+    releases the sessions of spawns that succeeded but lost. A credential
+    error only wins if no transport produces tools.
+    """
+    registry_id = job.server.get("registryId", "")
+    fingerprint = spawn_fingerprint(job.server)
+    configs = get_spawn_configs(job.server)
+    if not configs:
+        return job
+
+    tasks = {
+        asyncio.create_task(spawner.spawn(registry_id, c, fingerprint)): i
+        for i, c in enumerate(configs)
+    }
+    job.transports_tried = [c.get("transport", "") for c in configs]
+
+    pending = set(tasks)
+    winner: Optional[Tuple[dict, dict]] = None
+    credentials: Optional[Tuple[dict, Dict[str, str]]] = None
 
-        error_msg = result.get("error", "")
-        error_code = result.get("error_code", "")
-        last_error = error_msg
-        last_error_code = error_code
+    try:
+        while pending and winner is None:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            # Ties go to the higher-priority transport
+            for task in sorted(done, key=lambda t: tasks[t]):
+                config = configs[tasks[task]]
+                result = task.result()
+
+                if result.get("success"):
+                    if winner is None and result.get("tools"):
+                        winner = (config, result)
+                    continue
+
+                job.error = result.get("error", "")
+                job.error_code = result.get("error_code", "")
+                vars_required = spawn_required_vars(job.error_code, job.error)
+                if vars_required and credentials is None:
+                    credentials = (config, vars_required)
+    finally:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    if winner:
+        config, result = winner
+        job.tools = result.get("tools", [])
+        job.config = config
+        job.transport = config.get("transport", "")
+    elif credentials:
+        config, vars_required = credentials
+        job.vars_required = vars_required
+        job.config = config
+        job.transport = config.get("transport", "")
+
+    return job
+
+
+def generate_metadata(
+    job: ServerJob, llm: LLMService
+) -> Tuple[Optional[dict], Optional[dict], bool, str]:
+    """LLM stage: turn a spawn outcome into a compiled or failed record."""
+    server = job.server
+    registry_id = server.get("registryId", "")
+    original_name = server.get("name", "")
+    namespace = server.get("namespace", "")
+    original_desc = server.get("description", "")
+    repo_url = server.get("repoUrl", "")
 
-        vars_required = detect_required_vars(error_msg)
+    now = datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
+    fingerprint = registry_fingerprint(server)
+    repo_result = None
+    circuit_error = ""
 
-        if vars_required:
-            llm_result = llm.clean_server_from_repo(
-                registry_id, original_name, namespace, repo_url, original_desc, backend
+    def from_repo():
+        nonlocal circuit_error
+        try:
+            return llm.clean_server_from_repo(
+                registry_id, original_name, namespace, repo_url, original_desc
             )
+        except CircuitOpenError as e:
+            circuit_error = str(e)
+            return None
 
-            if llm_result:
-                compiled = CompiledServer(
-                    id=registry_id,
-                    registryId=registry_id,
-                    name=llm_result.name,
-                    slug=server.get("slug", ""),
-                    description=llm_result.description,
-                    tags=llm_result.tags,
-                    transport=transport,
-                    tools=[],
-                    tool_count=0,
-                    spawn=config,
-                    source=server.get("source", ""),
-                    compiled_at=datetime.now(timezone.utc)
-                    .isoformat()
-                    .replace("+00:00", "Z"),
-                    working_transport=transport,
-                    spawn_failed=True,
-                    vars_required=vars_required,
-                )
-                return (
-                    compiled.to_dict(),
-                    None,
-                    True,
-                    f"CREDENTIALS ({transport}): {list(vars_required.keys())}",
-                )
+    if job.tools:
+        try:
+            llm_result = llm.clean_server_with_tools(
+                registry_id,
+                original_name,
+                namespace,
+                repo_url,
+                job.tools,
+                original_desc=original_desc,
+            )
+        except CircuitOpenError as e:
+            llm_result, circuit_error = None, str(e)
+
+        if llm_result:
+            compiled = CompiledServer(
+                id=registry_id,
+                registryId=registry_id,
+                name=llm_result.name,
+                slug=server.get("slug", ""),
+                description=llm_result.description,
+                tags=llm_result.tags,
+                transport=job.transport,
+                tools=job.tools,
+                tool_count=len(job.tools),
+                spawn=job.config,
+                source=server.get("source", ""),
+                compiled_at=now,
+                working_transport=job.transport,
+                spawn_failed=False,
+                fingerprint=fingerprint,
+            )
+            return (
+                compiled.to_dict(),
+                None,
+                True,
+                f"SUCCESS ({job.transport}): {len(job.tools)} tools",
+            )
+
+        # Tools were discovered; only the metadata step failed, so a retry is cheap
+        job.error = circuit_error or "Metadata generation failed"
+        job.error_code = "LLM_CIRCUIT_OPEN" if circuit_error else "LLM_ERROR"
+
+    elif job.vars_required:
+        repo_result = from_repo()
+
+        if repo_result:
+            compiled = CompiledServer(
+                id=registry_id,
+                registryId=registry_id,
+                name=repo_result.name,
+                slug=server.get("slug", ""),
+                description=repo_result.description,
+                tags=repo_result.tags,
+                transport=job.transport,
+                tools=[],
+                tool_count=0,
+                spawn=job.config,
+                source=server.get("source", ""),
+                compiled_at=now,
+                working_transport=job.transport,
+                spawn_failed=True,
+                vars_required=job.vars_required,
+                fingerprint=fingerprint,
+            )
+            label = "preflight" if job.preflight else job.transport
+            return (
+                compiled.to_dict(),
+                None,
+                True,
+                f"CREDENTIALS ({label}): {list(job.vars_required.keys())}",
+            )
+        if circuit_error:
+            job.error, job.error_code = circuit_error, "LLM_CIRCUIT_OPEN"
 
     # All transports failed - generate metadata for failed entry
-    llm_result = llm.clean_server_from_repo(
-        registry_id, original_name, namespace, repo_url, original_desc, backend
-    )
+    if repo_result is None and not job.vars_required:
+        repo_result = from_repo()
 
-    name = llm_result.name if llm_result else original_name
-    description = llm_result.description if llm_result else original_desc
-    tags = llm_result.tags if llm_result else []
+    name = repo_result.name if repo_result else original_name
+    description = repo_result.description if repo_result else original_desc
+    tags = repo_result.tags if repo_result else []
 
     failed = FailedServer(
         id=registry_id,
@@ -474,32 +985,323 @@ def process_server_with_model(
         name=name,
         description=description,
         tags=tags,
-        error=last_error,
-        error_code=last_error_code,
-        transports_tried=transports_tried,
-        failed_at=datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
-        retryable=False,
+        error=job.error,
+        error_code=job.error_code,
+        transports_tried=job.transports_tried,
+        failed_at=now,
+        retryable=job.error_code in RETRYABLE_ERROR_CODES,
+        fingerprint=fingerprint,
     )
-    return (None, failed.to_dict(), False, f"FAILED: {last_error_code}")
+    return (None, failed.to_dict(), False, f"FAILED: {job.error_code}")
 
 
-class MCPCompiler:
+class StageTimings:
+    """Seconds each server spent per pipeline stage during one run.
+
+    ``total`` runs from the feeder picking the server up to its record.
+    """
+
+    STAGES = ("spawn", "llm", "total")
+
     def __init__(self):
-        from llm_service import LLMService
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in self.STAGES}
+
+    def observe(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def percentile(self, stage: str, q: float) -> float:
+        return percentile(self.samples[stage], q)
+
+    def summary(self) -> Dict[str, str]:
+        return {
+            stage: f"p50 {self.percentile(stage, 0.5):.2f}s, "
+            f"p95 {self.percentile(stage, 0.95):.2f}s over {len(samples)}"
+            for stage, samples in self.samples.items()
+            if samples
+        }
+
+
+StageOutcome = Union[Tuple[Optional[dict], Optional[dict], bool, str], Exception]
+
+
+class CompilePipeline:
+    """Three-stage asyncio pipeline: spawn -> LLM metadata -> record.
+
+    Each stage pulls from its own bounded queue with its own worker count, so
+    tens of Runtime spawns can wait concurrently while a smaller pool keeps the
+    LLM backends busy. Records are handed to ``on_result`` one at a time from
+    the event loop, so the callback never races with itself. Servers whose
+    registry entry declares required credentials bypass the spawn stage
+    entirely unless ``force_spawn`` is set.
+
+    Spawn workers are started up to ``spawn_max``; how many Runtime requests
+    are actually in flight is set by an AIMD controller between ``spawn_min``
+    and ``spawn_max``, starting from ``spawn_workers``.
+    """
+
+    def __init__(
+        self,
+        llm: LLMService,
+        on_result: Callable[[dict, StageOutcome], None],
+        spawn_workers: int = SPAWN_WORKERS,
+        llm_workers: int = LLM_WORKERS,
+        race: bool = False,
+        force_spawn: bool = False,
+        tool_cache: Optional[SqliteCache] = None,
+        failures: Optional[SpawnFailureCache] = None,
+        spawn_min: int = SPAWN_MIN_WORKERS,
+        spawn_max: int = SPAWN_MAX_WORKERS,
+        breakers: Optional[BreakerRegistry] = None,
+        timeouts: Optional[AdaptiveTimeouts] = None,
+        live_sessions: int = 0,
+        spawn_batch: int = 0,
+    ):
+        self.llm = llm
+        self.on_result = on_result
+        self.spawn_limit = AIMDController(
+            initial=spawn_workers,
+            floor=min(spawn_min, spawn_workers),
+            ceiling=max(spawn_max, spawn_workers),
+            target_p95=SPAWN_TARGET_P95,
+        )
+        self.spawn_workers = self.spawn_limit.ceiling
+        self.llm_workers = max(1, llm_workers)
+        self.race = race
+        self.force_spawn = force_spawn
+        self.tool_cache = tool_cache
+        self.failures = failures
+        self.spawn_flights = AsyncSingleFlight()
+        self.breakers = breakers
+        self.timeouts = timeouts
+        self.live_sessions = LiveSessions(live_sessions)
+        self.spawn_batch = spawn_batch
+        self.runtime_stats = ConnectionStats()
+        self.timings = StageTimings()
+
+    def run(self, servers: List[dict]):
+        asyncio.run(self._run(servers))
+
+    async def _run(self, servers: List[dict]):
+        spawn_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=self.spawn_workers * QUEUE_DEPTH_FACTOR
+        )
+        llm_queue: asyncio.Queue = asyncio.Queue(
+            maxsize=self.llm_workers * QUEUE_DEPTH_FACTOR
+        )
+        record_queue: asyncio.Queue = asyncio.Queue()
+
+        async def feed():
+            for server in servers:
+                job = ServerJob(server=server, queued_at=time.monotonic())
+                # Preflight: servers that declare credentials skip the Runtime
+                if not self.force_spawn and preflight_credentials(job):
+                    await llm_queue.put(job)
+                else:
+                    await spawn_queue.put(job)
+            for _ in range(self.spawn_workers):
+                await spawn_queue.put(None)
+
+        async def spawn_stage(spawner: Spawner):
+            await asyncio.gather(
+                *(
+                    self._spawn_worker(spawner, spawn_queue, llm_queue, record_queue)
+                    for _ in range(self.spawn_workers)
+                )
+            )
+            await spawner.close()
+            for _ in range(self.llm_workers):
+                await llm_queue.put(None)
+
+        async def llm_stage(executor: ThreadPoolExecutor):
+            await asyncio.gather(
+                *(
+                    self._llm_worker(executor, llm_queue, record_queue)
+                    for _ in range(self.llm_workers)
+                )
+            )
+            await record_queue.put(None)
+
+        # The controller caps in-flight requests, race mode included
+        async with RuntimeClient(
+            self.spawn_limit.ceiling, batch_size=self.spawn_batch
+        ) as runtime:
+            self.runtime_stats = runtime.stats
+            with ThreadPoolExecutor(max_workers=self.llm_workers) as executor:
+                await asyncio.gather(
+                    feed(),
+                    spawn_stage(
+                        Spawner(
+                            runtime,
+                            self.tool_cache,
+                            self.failures,
+                            self.spawn_flights,
+                            self.spawn_limit,
+                            self.breakers,
+                            self.timeouts,
+                            self.live_sessions,
+                        )
+                    ),
+                    llm_stage(executor),
+                    self._record_worker(record_queue),
+                )
+
+    async def _spawn_worker(
+        self,
+        spawner: Spawner,
+        spawn_queue: asyncio.Queue,
+        llm_queue: asyncio.Queue,
+        record_queue: asyncio.Queue,
+    ):
+        while True:
+            job = await spawn_queue.get()
+            if job is None:
+                return
+            started = time.monotonic()
+            try:
+                job = await discover_tools(spawner, job, self.race)
+                self.timings.observe("spawn", time.monotonic() - started)
+                await llm_queue.put(job)
+            except Exception as e:
+                await record_queue.put((job, e))
+
+    async def _llm_worker(
+        self,
+        executor: ThreadPoolExecutor,
+        llm_queue: asyncio.Queue,
+        record_queue: asyncio.Queue,
+    ):
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await llm_queue.get()
+            if job is None:
+                return
+            started = time.monotonic()
+            try:
+                outcome = await loop.run_in_executor(
+                    executor, generate_metadata, job, self.llm
+                )
+                self.timings.observe("llm", time.monotonic() - started)
+            except Exception as e:
+                outcome = e
+            await record_queue.put((job, outcome))
+
+    async def _record_worker(self, record_queue: asyncio.Queue):
+        while True:
+            item = await record_queue.get()
+            if item is None:
+                return
+            job, outcome = item
+            self.on_result(job.server, outcome)
+            self.timings.observe("total", time.monotonic() - job.queued_at)
 
-        self.llm = LLMService()
+
+class MCPCompiler:
+    def __init__(
+        self,
+        race: bool = False,
+        force_spawn: bool = False,
+        backend_weights: Optional[Dict[str, float]] = None,
+        llm_cache: bool = True,
+        tool_cache: bool = True,
+        negative_cache: bool = True,
+        incremental: bool = False,
+        spawn_min: int = SPAWN_MIN_WORKERS,
+        spawn_max: int = SPAWN_MAX_WORKERS,
+        adaptive_timeouts: bool = True,
+        hedge_budget: Optional[float] = None,
+        stream: bool = False,
+        batch_size: int = 0,
+        fast_path: bool = False,
+        compact_prompts: bool = False,
+        live_sessions: int = LIVE_SESSIONS,
+        spawn_batch: int = 0,
+    ):
+        self.race = race
+        self.live_sessions = live_sessions
+        self.spawn_batch = spawn_batch
+        # Stage timings of the last pipeline run, per phase label
+        self.phase_timings: Dict[str, StageTimings] = {}
+        self.incremental = incremental
+        self.spawn_min = spawn_min
+        self.spawn_max = spawn_max
+        self.spawn_breakers = BreakerRegistry(
+            "spawn", SPAWN_BREAKER_THRESHOLD, SPAWN_BREAKER_COOLDOWN
+        )
+        self.spawn_timeouts = (
+            AdaptiveTimeouts(SqliteCache(CACHE_PATH, "spawn_latency"), SPAWN_TIMEOUT)
+            if adaptive_timeouts
+            else None
+        )
+        self.force_spawn = force_spawn
+        self.backend_weights = backend_weights or {}
+        self.llm_cache = (
+            SqliteCache(
+                CACHE_PATH,
+                "llm_responses",
+                max_entries=LLM_CACHE_MAX_ENTRIES,
+                max_age_s=LLM_CACHE_MAX_AGE_DAYS * 86400,
+            )
+            if llm_cache
+            else None
+        )
+        self.llm = LLMService(
+            cache=self.llm_cache,
+            hedge_budget=hedge_budget,
+            stream=stream,
+            batch_size=batch_size,
+            fast_path=fast_path,
+            compact_prompts=compact_prompts,
+        )
+        self.tool_cache = (
+            SqliteCache(
+                CACHE_PATH,
+                "tool_lists",
+                max_entries=TOOL_CACHE_MAX_ENTRIES,
+                max_age_s=TOOL_CACHE_TTL_HOURS * 3600,
+            )
+            if tool_cache
+            else None
+        )
+        if self.live_sessions and self.tool_cache is not None:
+            print(
+                "[Runtime] Live sessions only apply with --no-tool-cache; "
+                "releasing every session after its tools are cached"
+            )
+            self.live_sessions = 0
+        self.spawn_failures = (
+            SpawnFailureCache(
+                SqliteCache(
+                    CACHE_PATH,
+                    "spawn_failures",
+                    max_entries=TOOL_CACHE_MAX_ENTRIES,
+                    max_age_s=3600
+                    * max(NEGATIVE_CACHE_TTL_HOURS, NEGATIVE_TIMEOUT_TTL_HOURS),
+                )
+            )
+            if negative_cache
+            else None
+        )
+        self.llm.scheduler.set_weights(self.backend_weights)
         self.servers = []
+        self.registry_ids: set = set()
         self.compiled: Dict[str, dict] = {}
         self.failed: Dict[str, dict] = {}
         self.progress = Progress()
         self.backends = self.llm.get_available_backends()
 
         OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+        self.journal = CompileJournal(JOURNAL_PATH)
+        self.ledger = CompletionLedger(LEDGER_PATH)
 
         existing = self.load_compiled()
         if existing:
             self.compiled = existing
             print(f"[Compiler] Loaded {len(existing)} existing compiled servers")
+        self.failed = self.load_failed()
+
+        replayed = self.replay_journal()
+        if replayed:
+            print(f"[Compiler] Replayed {replayed} journal entries")
 
     def load_servers(self) -> list:
         print(f"[Compiler] Loading servers from {REGISTRY_REFINED_PATH}")
@@ -508,6 +1310,7 @@ class MCPCompiler:
 
         self.servers = data if isinstance(data, list) else data.get("servers", [])
         self.servers = [s for s in self.servers if s.get("origin") == "mcp"]
+        self.registry_ids = {s.get("registryId") for s in self.servers}
 
         print(f"[Compiler] Loaded {len(self.servers)} MCP servers")
         return self.servers
@@ -524,8 +1327,8 @@ class MCPCompiler:
             self.progress.updated_at = (
                 datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
             )
-            with open(PROGRESS_PATH, "w") as f:
-                json.dump(self.progress.to_dict(), f, indent=2)
+            data = self.progress.to_dict()
+        write_json_atomic(PROGRESS_PATH, data)
 
     def load_compiled(self) -> dict:
         if MCPCOMPILED_PATH.exists():
@@ -534,36 +1337,123 @@ class MCPCompiler:
             return {s["id"]: s for s in data.get("servers", [])}
         return {}
 
+    def load_failed(self) -> dict:
+        if FAILEDSERVERS_PATH.exists():
+            with open(FAILEDSERVERS_PATH) as f:
+                data = json.load(f)
+            return {s["id"]: s for s in data.get("servers", [])}
+        return {}
+
+    def replay_journal(self) -> int:
+        """Apply journal entries written since the last materialized output."""
+        count = 0
+        for entry in self.journal.replay():
+            registry_id = entry["id"]
+            if entry.get("kind") == "compiled":
+                self.compiled[registry_id] = entry["record"]
+                self.failed.pop(registry_id, None)
+            elif entry.get("kind") == "failed":
+                self.failed[registry_id] = entry["record"]
+                self.compiled.pop(registry_id, None)
+            elif entry.get("kind") == "removed":
+                self.compiled.pop(registry_id, None)
+                self.failed.pop(registry_id, None)
+            count += 1
+        return count
+
+    def record_compiled(self, registry_id: str, compiled: dict):
+        with compiled_lock:
+            self.compiled[registry_id] = compiled
+        with failed_lock:
+            self.failed.pop(registry_id, None)
+        self.journal.append("compiled", registry_id, compiled)
+
+    def record_failed(self, registry_id: str, failed: dict):
+        with failed_lock:
+            self.failed[registry_id] = failed
+        with compiled_lock:
+            self.compiled.pop(registry_id, None)
+        self.journal.append("failed", registry_id, failed)
+
+    def record_removed(self, registry_id: str):
+        with compiled_lock:
+            self.compiled.pop(registry_id, None)
+        with failed_lock:
+            self.failed.pop(registry_id, None)
+        self.journal.append("removed", registry_id)
+
+    def plan_incremental(self, servers: List[dict]) -> List[dict]:
+        """Keep added or changed registry entries and drop removed ones.
+
+        Each compiled or failed record carries the fingerprint of the entry it
+        was built from; entries whose fingerprint still matches are skipped.
+        Records from before fingerprints existed count as changed.
+        """
+        removed = [
+            registry_id
+            for registry_id in list(self.compiled) + list(self.failed)
+            if registry_id not in self.registry_ids
+        ]
+        for registry_id in removed:
+            self.record_removed(registry_id)
+
+        added, changed, pending = 0, 0, []
+        for server in servers:
+            registry_id = server.get("registryId")
+            previous = self.compiled.get(registry_id) or self.failed.get(registry_id)
+            if previous is None:
+                added += 1
+            elif previous.get("fingerprint") != registry_fingerprint(server):
+                changed += 1
+            else:
+                continue
+            pending.append(server)
+
+        print(
+            f"[Incremental] {added} added, {changed} changed, "
+            f"{len(servers) - len(pending)} unchanged, {len(removed)} removed"
+        )
+        return pending
+
+    def checkpoint(self):
+        # Journal first: a ledger entry must never outlive its result
+        self.journal.sync()
+        self.ledger.sync()
+        self.save_progress()
+
     def save_compiled(self):
         with compiled_lock:
             servers = list(self.compiled.values())
-            output = {
-                "compiledAt": datetime.now(timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z"),
-                "totalCount": len(servers),
-                "successCount": self.progress.success_count,
-                "failedCount": len(self.failed),
-                "retryCount": self.progress.retry_count,
-                "servers": servers,
-            }
-            with open(MCPCOMPILED_PATH, "w") as f:
-                json.dump(output, f, indent=2)
+        output = {
+            "compiledAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "totalCount": len(servers),
+            "successCount": self.progress.success_count,
+            "failedCount": len(self.failed),
+            "retryCount": self.progress.retry_count,
+            "servers": servers,
+        }
+        write_json_atomic(MCPCOMPILED_PATH, output)
 
     def save_failed(self):
         with failed_lock:
             servers = list(self.failed.values())
-            output = {
-                "failedAt": datetime.now(timezone.utc)
-                .isoformat()
-                .replace("+00:00", "Z"),
-                "totalCount": len(servers),
-                "servers": servers,
-            }
-            with open(FAILEDSERVERS_PATH, "w") as f:
-                json.dump(output, f, indent=2)
+        output = {
+            "failedAt": datetime.now(timezone.utc).isoformat().replace("+00:00", "Z"),
+            "totalCount": len(servers),
+            "servers": servers,
+        }
+        write_json_atomic(FAILEDSERVERS_PATH, output)
+
+    def materialize(self):
+        """Write the pretty output files, then drop the journal they now contain."""
+        self.journal.sync()
+        self.save_compiled()
+        self.save_failed()
+        self.journal.reset()
 
     def cleanup_output(self):
+        self.journal.reset()
+        self.ledger.reset()
         for p in [MCPCOMPILED_PATH, FAILEDSERVERS_PATH, PROGRESS_PATH]:
             if p.exists():
                 p.unlink()
@@ -571,10 +1461,86 @@ class MCPCompiler:
         self.failed = {}
         print("[Compiler] Cleaned up output files")
 
+    def print_service_stats(self, label: str, pipeline: CompilePipeline):
+        print(f"[{label}] Runtime connections: {pipeline.runtime_stats.summary()}")
+        sessions = pipeline.runtime_stats.sessions_summary()
+        print(f"[{label}] Runtime sessions: {sessions}")
+        if pipeline.spawn_batch:
+            batching = pipeline.runtime_stats.batch_summary()
+            print(f"[{label}] Spawn batching: {batching}")
+        if pipeline.live_sessions.capacity:
+            print(f"[{label}] Live sessions: {pipeline.live_sessions.summary()}")
+        print(f"[{label}] Live LLM connections: {CLIENTS.live_connections()}")
+        print(f"[{label}] Spawn concurrency: {pipeline.spawn_limit.summary()}")
+        self.phase_timings[label] = pipeline.timings
+        for stage, summary in pipeline.timings.summary().items():
+            print(f"[{label}] Stage {stage}: {summary}")
+        if self.spawn_timeouts is not None:
+            self.spawn_timeouts.save()
+            for transport, summary in self.spawn_timeouts.summary().items():
+                print(f"[{label}] Spawn {transport}: {summary}")
+        print(f"[{label}] Spawn singleflight: {pipeline.spawn_flights.summary()}")
+        print(f"[{label}] LLM singleflight: {self.llm.flights.summary()}")
+        if self.llm.hedges is not None:
+            print(f"[{label}] LLM hedging: {self.llm.hedges.summary()}")
+        if self.llm.stream:
+            print(f"[{label}] LLM streaming: {self.llm.stream_stats.summary()}")
+        if self.llm.batcher is not None:
+            print(f"[{label}] LLM batching: {self.llm.batcher.summary()}")
+        if self.llm.classifier is not None:
+            print(f"[{label}] Local classifier: {self.llm.classifier.summary()}")
+        if self.llm.compact_prompts:
+            print(f"[{label}] Prompt compaction: {self.llm.prompt_stats.summary()}")
+        for model, summary in RATE_LIMITS.summary().items():
+            print(f"[{label}] Rate limit {model}: {summary}")
+        for model, summary in self.llm.scheduler.summary().items():
+            print(f"[{label}] Backend {model}: {summary}")
+        for registry in (self.spawn_breakers, self.llm.breakers):
+            for key, summary in registry.summary().items():
+                print(f"[{label}] Breaker {registry.scope}:{key}: {summary}")
+        if self.llm_cache is not None:
+            print(f"[{label}] LLM cache: {self.llm_cache.summary()}")
+        if self.tool_cache is not None:
+            print(f"[{label}] Tool cache: {self.tool_cache.summary()}")
+        if self.spawn_failures is not None:
+            print(f"[{label}] Negative cache: {self.spawn_failures.summary()}")
+
+    def _pipeline(
+        self,
+        record: Callable[[dict, StageOutcome], None],
+        workers: int,
+        spawn_workers: int,
+    ) -> CompilePipeline:
+        if self.llm.batcher is not None:
+            # Workers mostly wait on a shared batch; keep enough of them to fill one
+            workers *= self.llm.batcher.max_size
+        if self.llm.hedges is not None:
+            self.llm.size_hedge_pool(workers)
+        return CompilePipeline(
+            self.llm,
+            record,
+            spawn_workers=spawn_workers,
+            llm_workers=workers,
+            race=self.race,
+            force_spawn=self.force_spawn,
+            tool_cache=self.tool_cache,
+            failures=self.spawn_failures,
+            spawn_min=self.spawn_min,
+            spawn_max=self.spawn_max,
+            breakers=self.spawn_breakers,
+            timeouts=self.spawn_timeouts,
+            live_sessions=self.live_sessions,
+            spawn_batch=self.spawn_batch,
+        )
+
     def run_phase1(
-        self, limit: Optional[int] = None, resume: bool = False, workers: int = 3
+        self,
+        limit: Optional[int] = None,
+        resume: bool = False,
+        workers: int = LLM_WORKERS,
+        spawn_workers: int = SPAWN_WORKERS,
     ):
-        """Phase 1: Parallel processing with 3 models assigned round-robin."""
+        """Phase 1: Pipelined spawn + metadata, models chosen per request."""
         print("\n" + "=" * 60)
         print("PHASE 1: Tool Discovery & Metadata Generation (Parallel)")
         print("=" * 60)
@@ -583,30 +1549,27 @@ class MCPCompiler:
             progress = self.load_progress()
             if progress:
                 self.progress = progress
-                print(f"[Phase 1] Resuming from: {self.progress.last_processed_id}")
-
-        servers_to_process = self.servers
+            completed = self.ledger.completed_ids()
+            print(f"[Phase 1] Resuming: {len(completed)} servers already completed")
+        else:
+            self.ledger.reset()
+            completed = set()
 
-        if resume and self.progress.last_processed_id:
-            start_idx = (
-                next(
-                    (
-                        i
-                        for i, s in enumerate(servers_to_process)
-                        if s.get("registryId") == self.progress.last_processed_id
-                    ),
-                    0,
-                )
-                + 1
-            )
-            servers_to_process = servers_to_process[start_idx:]
+        servers_to_process = [
+            s for s in self.servers if s.get("registryId") not in completed
+        ]
 
         if limit:
             servers_to_process = servers_to_process[:limit]
 
-        servers_to_process = [
-            s for s in servers_to_process if s.get("registryId") not in self.compiled
-        ]
+        if self.incremental:
+            servers_to_process = self.plan_incremental(servers_to_process)
+        else:
+            servers_to_process = [
+                s
+                for s in servers_to_process
+                if s.get("registryId") not in self.compiled
+            ]
 
         self.progress.total = len(self.servers)
         self.progress.phase = 1
@@ -621,96 +1584,101 @@ class MCPCompiler:
         print(f"[Phase 1] {len(servers_to_process)} servers to process")
         if already_compiled > 0:
             print(f"[Phase 1] {already_compiled} already compiled (skipped)")
-        print(f"[Phase 1] {num_models} models in parallel")
+        print(
+            f"[Phase 1] {num_models} models (dynamic dispatch), "
+            f"{spawn_workers} spawn workers "
+            f"(adaptive {self.spawn_min}-{self.spawn_max}), {workers} LLM workers"
+        )
         for i, b in enumerate(self.backends):
             print(
-                f"  - Model {i + 1}: {b['model']} (servers {i}::{i + num_models}::{i + 2 * num_models}...)"
+                f"  - Model {i + 1}: {b['model']} "
+                f"(weight {self.backend_weights.get(b['model'], b.get('weight', 1.0)):g})"
             )
+        if self.race:
+            print("[Phase 1] Transport race mode enabled")
+        if self.force_spawn:
+            print("[Phase 1] Credential preflight disabled (--force-spawn)")
         print(f"[Phase 1] Connector: {CONNECTOR_URL}")
         print(f"[Phase 1] Runtime: {RUNTIME_URL}")
 
         if not servers_to_process:
             print("[Phase 1] No servers to process")
+            self.materialize()
             return
 
-        # Prepare args for parallel processing
-        # Assign model based on index: model_idx = index % num_models
-        process_args = [
-            (server, idx % num_models, self.backends)
-            for idx, server in enumerate(servers_to_process)
-        ]
-
-        processed = 0
         checkpoint_counter = 0
 
-        with ThreadPoolExecutor(max_workers=num_models) as executor:
-            futures = {
-                executor.submit(process_server_with_model, arg): arg[0]
-                for arg in process_args
-            }
+        with tqdm(total=len(servers_to_process), desc="Processing servers") as pbar:
 
-            with tqdm(total=len(servers_to_process), desc="Processing servers") as pbar:
-                for future in as_completed(futures):
-                    server = futures[future]
-                    registry_id = server.get("registryId")
-
-                    try:
-                        compiled, failed, success, msg = future.result()
-
-                        if compiled:
-                            with compiled_lock:
-                                self.compiled[registry_id] = compiled
-                            if success and not compiled.get("vars_required"):
-                                with progress_lock:
-                                    self.progress.success_count += 1
-                                pbar.write(f"[OK] {registry_id}: {msg}")
-                            else:
-                                with progress_lock:
-                                    self.progress.failed_count += 1
-                                pbar.write(f"[CRED] {registry_id}: {msg}")
-
-                        if failed:
-                            with failed_lock:
-                                self.failed[registry_id] = failed
-                            with progress_lock:
-                                self.progress.failed_count += 1
-                            pbar.write(f"[FAIL] {registry_id}: {msg}")
+            def record(server: dict, outcome: StageOutcome):
+                nonlocal checkpoint_counter
+                registry_id = server.get("registryId")
 
-                        with progress_lock:
-                            self.progress.processed += 1
-                            self.progress.last_processed_id = registry_id
-
-                        processed += 1
-                        checkpoint_counter += 1
-                        pbar.set_postfix(
-                            {
-                                "ok": self.progress.success_count,
-                                "fail": len(self.failed),
-                            }
-                        )
-                        pbar.update(1)
+                if isinstance(outcome, Exception):
+                    pbar.write(f"[{registry_id}] ERROR: {outcome}")
+                    with progress_lock:
+                        self.progress.processed += 1
+                    pbar.update(1)
+                    return
 
-                        if checkpoint_counter >= CHECKPOINT_INTERVAL:
-                            self.save_progress()
-                            self.save_compiled()
-                            self.save_failed()
-                            checkpoint_counter = 0
+                compiled, failed, success, msg = outcome
 
-                    except Exception as e:
-                        pbar.write(f"[{registry_id}] ERROR: {e}")
+                if compiled:
+                    self.record_compiled(registry_id, compiled)
+                    if success and not compiled.get("vars_required"):
+                        self.ledger.mark(registry_id, "compiled")
                         with progress_lock:
-                            self.progress.processed += 1
+                            self.progress.success_count += 1
+                        pbar.write(f"[OK] {registry_id}: {msg}")
+                    else:
+                        self.ledger.mark(registry_id, "credentials")
+                        with progress_lock:
+                            self.progress.failed_count += 1
+                        pbar.write(f"[CRED] {registry_id}: {msg}")
+
+                if failed:
+                    self.record_failed(registry_id, failed)
+                    self.ledger.mark(registry_id, "failed")
+                    with progress_lock:
+                        self.progress.failed_count += 1
+                    pbar.write(f"[FAIL] {registry_id}: {msg}")
+
+                with progress_lock:
+                    self.progress.processed += 1
+                    self.progress.last_processed_id = registry_id
+
+                checkpoint_counter += 1
+                pbar.set_postfix(
+                    {
+                        "ok": self.progress.success_count,
+                        "fail": len(self.failed),
+                    }
+                )
+                pbar.update(1)
+
+                if checkpoint_counter >= CHECKPOINT_INTERVAL:
+                    self.checkpoint()
+                    checkpoint_counter = 0
 
+            pipeline = self._pipeline(record, workers, spawn_workers)
+            pipeline.run(servers_to_process)
+
+        self.ledger.sync()
         self.save_progress()
-        self.save_compiled()
-        self.save_failed()
+        self.materialize()
 
         print(
             f"\n[Phase 1] Complete: {self.progress.success_count} with tools, "
             f"{len(self.failed)} failed"
         )
+        self.print_service_stats("Phase 1", pipeline)
 
-    def run_phase2(self, limit: Optional[int] = None):
+    def run_phase2(
+        self,
+        limit: Optional[int] = None,
+        workers: int = LLM_WORKERS,
+        spawn_workers: int = SPAWN_WORKERS,
+    ):
         """Phase 2: Retry failed servers."""
         print("\n" + "=" * 60)
         print("PHASE 2: Retry Failed Servers")
@@ -733,68 +1701,62 @@ class MCPCompiler:
             print("[Phase 2] No servers to retry")
             return
 
-        num_models = len(self.backends)
-
         # Remove from failed before retry
         for server in servers_to_retry:
             registry_id = server.get("registryId")
             if registry_id in self.failed:
                 del self.failed[registry_id]
 
-        process_args = [
-            (server, idx % num_models, self.backends)
-            for idx, server in enumerate(servers_to_retry)
-        ]
-
         retry_success = 0
 
-        with ThreadPoolExecutor(max_workers=num_models) as executor:
-            futures = {
-                executor.submit(process_server_with_model, arg): arg[0]
-                for arg in process_args
-            }
+        with tqdm(total=len(servers_to_retry), desc="Retrying servers") as pbar:
 
-            with tqdm(total=len(servers_to_retry), desc="Retrying servers") as pbar:
-                for future in as_completed(futures):
-                    server = futures[future]
-                    registry_id = server.get("registryId")
-
-                    try:
-                        compiled, failed, success, msg = future.result()
-
-                        if compiled:
-                            with compiled_lock:
-                                self.compiled[registry_id] = compiled
-                            if success and not compiled.get("vars_required"):
-                                with progress_lock:
-                                    self.progress.success_count += 1
-                                    self.progress.retry_count += 1
-                                    retry_success += 1
-                                pbar.write(f"[{registry_id}] RETRY SUCCESS")
-                            else:
-                                with progress_lock:
-                                    self.progress.failed_count += 1
-
-                        if failed:
-                            failed["retryable"] = False
-                            with failed_lock:
-                                self.failed[registry_id] = failed
-
-                        pbar.update(1)
-
-                    except Exception as e:
-                        pbar.write(f"[{registry_id}] RETRY ERROR: {e}")
+            def record(server: dict, outcome: StageOutcome):
+                nonlocal retry_success
+                registry_id = server.get("registryId")
 
-        self.save_compiled()
-        self.save_failed()
+                if isinstance(outcome, Exception):
+                    pbar.write(f"[{registry_id}] RETRY ERROR: {outcome}")
+                    pbar.update(1)
+                    return
+
+                compiled, failed, success, msg = outcome
+
+                if compiled:
+                    self.record_compiled(registry_id, compiled)
+                    if success and not compiled.get("vars_required"):
+                        with progress_lock:
+                            self.progress.success_count += 1
+                            self.progress.retry_count += 1
+                            retry_success += 1
+                        pbar.write(f"[{registry_id}] RETRY SUCCESS")
+                    else:
+                        with progress_lock:
+                            self.progress.failed_count += 1
+
+                if failed:
+                    failed["retryable"] = False
+                    self.record_failed(registry_id, failed)
+
+                pbar.update(1)
+
+            pipeline = self._pipeline(record, workers, spawn_workers)
+            pipeline.run(servers_to_retry)
+
+        self.materialize()
 
         print(f"\n[Phase 2] Complete: {retry_success} retries succeeded")
+        self.print_service_stats("Phase 2", pipeline)
 
     def run_all(
-        self, limit: Optional[int] = None, resume: bool = False, workers: int = 3
+        self,
+        limit: Optional[int] = None,
+        resume: bool = False,
+        workers: int = LLM_WORKERS,
+        spawn_workers: int = SPAWN_WORKERS,
     ):
-        self.run_phase1(limit, resume, workers)
-        self.run_phase2(limit)
+        self.run_phase1(limit, resume, workers, spawn_workers)
+        self.run_phase2(limit, workers, spawn_workers)
 
         print("\n" + "=" * 60)
         print("COMPILATION COMPLETE")
@@ -808,9 +1770,34 @@ class MCPCompiler:
         print(f"Failed (not included): {len(self.failed)}")
         print(f"Output: {MCPCOMPILED_PATH}")
         print(f"Failed: {FAILEDSERVERS_PATH}")
+        print("Backend throughput:")
+        for model, summary in self.llm.scheduler.summary().items():
+            print(f"  - {model}: {summary}")
+        transitions = sorted(
+            self.spawn_breakers.transitions + self.llm.breakers.transitions,
+            key=lambda t: t.at,
+        )
+        print(f"Circuit breaker changes: {len(transitions)}")
+        for transition in transitions:
+            print(f"  - {transition}")
+
+
+def parse_backend_weights(value: str) -> Dict[str, float]:
+    weights = {}
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        model, _, weight = item.rpartition("=")
+        if not model:
+            raise argparse.ArgumentTypeError(f"expected model=weight, got {item!r}")
+        try:
+            weights[model.strip()] = float(weight)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid weight in {item!r}")
+    return weights
 
 
-def main():
+def build_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(description="MCP Server Compiler")
     parser.add_argument(
         "--phase",
@@ -829,14 +1816,167 @@ def main():
         "--resume", action="store_true", help="Resume from last checkpoint"
     )
     parser.add_argument(
-        "--workers", type=int, default=3, help="Number of parallel models"
+        "--workers",
+        type=int,
+        default=LLM_WORKERS,
+        help="Number of concurrent LLM metadata requests",
+    )
+    parser.add_argument(
+        "--spawn-workers",
+        type=int,
+        default=SPAWN_WORKERS,
+        help="Initial number of concurrent Runtime spawns",
+    )
+    parser.add_argument(
+        "--spawn-min",
+        type=int,
+        default=SPAWN_MIN_WORKERS,
+        help="Floor for the adaptive spawn concurrency",
+    )
+    parser.add_argument(
+        "--spawn-max",
+        type=int,
+        default=SPAWN_MAX_WORKERS,
+        help="Ceiling for the adaptive spawn concurrency",
+    )
+    parser.add_argument(
+        "--fixed-spawn-timeout",
+        action="store_true",
+        help="Use SPAWN_TIMEOUT for every transport instead of observed latencies",
+    )
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        nargs="?",
+        const=LLM_HEDGE_BUDGET,
+        default=None,
+        metavar="BUDGET",
+        help="Hedge slow LLM requests onto another backend, at most BUDGET "
+        f"extra requests (default {LLM_HEDGE_BUDGET:g})",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream LLM completions and stop once a valid JSON object closes",
+    )
+    parser.add_argument(
+        "--batch",
+        type=int,
+        nargs="?",
+        const=LLM_BATCH_SIZE,
+        default=0,
+        metavar="K",
+        help="Pack up to K servers into one LLM request, fewer if the backend's "
+        f"context window is smaller (default {LLM_BATCH_SIZE})",
+    )
+    parser.add_argument(
+        "--fast-path",
+        action="store_true",
+        help="Classify servers with obvious tags locally and only send the rest "
+        "to the LLM",
+    )
+    parser.add_argument(
+        "--compact-prompts",
+        action="store_true",
+        help="Pack the most informative tools into each backend's prompt token "
+        "budget instead of the first 20",
+    )
+    parser.add_argument(
+        "--live-sessions",
+        type=int,
+        default=LIVE_SESSIONS,
+        metavar="N",
+        help="With --no-tool-cache, keep up to N spawned sessions alive so "
+        "identical spawn configs reuse them via tools/list "
+        "(default: release every session)",
+    )
+    parser.add_argument(
+        "--spawn-batch",
+        type=int,
+        nargs="?",
+        const=SPAWN_BATCH_SIZE,
+        default=0,
+        metavar="N",
+        help="Send up to N concurrent spawns per /mcp/spawn/batch request when "
+        f"the Runtime advertises it (default {SPAWN_BATCH_SIZE})",
     )
     parser.add_argument(
         "--test", action="store_true", help="Run test mode (10 servers)"
     )
-    args = parser.parse_args()
+    parser.add_argument(
+        "--race",
+        action="store_true",
+        help="Spawn all transports concurrently and keep the first with tools",
+    )
+    parser.add_argument(
+        "--force-spawn",
+        action="store_true",
+        help="Spawn servers even when the registry declares required credentials",
+    )
+    parser.add_argument(
+        "--materialize",
+        action="store_true",
+        help="Replay the journal into mcpCompiled.json/failedServers.json and exit",
+    )
+    parser.add_argument(
+        "--backend-weights",
+        type=parse_backend_weights,
+        default={},
+        help="Scheduler weights, e.g. qwen/qwen3-32b=2,minimax/minimax-m2.1=0.5",
+    )
+    parser.add_argument(
+        "--no-llm-cache",
+        action="store_true",
+        help="Bypass the persistent LLM response cache",
+    )
+    parser.add_argument(
+        "--no-tool-cache",
+        action="store_true",
+        help="Always spawn instead of reusing tool lists for identical spawn configs",
+    )
+    parser.add_argument(
+        "--no-negative-cache",
+        action="store_true",
+        help="Re-spawn configs that previously failed with permanent errors",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only compile registry entries added or changed since the last run",
+    )
+    return parser
+
+
+def compiler_from_args(args: argparse.Namespace) -> MCPCompiler:
+    return MCPCompiler(
+        race=args.race,
+        force_spawn=args.force_spawn,
+        backend_weights=args.backend_weights,
+        llm_cache=not args.no_llm_cache,
+        tool_cache=not args.no_tool_cache,
+        negative_cache=not args.no_negative_cache,
+        incremental=args.incremental,
+        spawn_min=args.spawn_min,
+        spawn_max=args.spawn_max,
+        adaptive_timeouts=not args.fixed_spawn_timeout,
+        hedge_budget=args.hedge,
+        stream=args.stream,
+        batch_size=args.batch,
+        fast_path=args.fast_path,
+        compact_prompts=args.compact_prompts,
+        live_sessions=args.live_sessions,
+        spawn_batch=args.spawn_batch,
+    )
+
+
+def main():
+    args = build_parser().parse_args()
+    compiler = compiler_from_args(args)
+    if args.materialize:
+        compiler.materialize()
+        print(f"[Compiler] Materialized {len(compiler.compiled)} servers")
+        return
 
-    compiler = MCPCompiler()
     compiler.load_servers()
 
     if args.start > 0:
@@ -848,11 +1988,11 @@ def main():
     limit = args.limit or (10 if args.test else None)
 
     if args.phase == 1:
-        compiler.run_phase1(limit, args.resume, args.workers)
+        compiler.run_phase1(limit, args.resume, args.workers, args.spawn_workers)
     elif args.phase == 2:
-        compiler.run_phase2(limit)
+        compiler.run_phase2(limit, args.workers, args.spawn_workers)
     else:
-        compiler.run_all(limit, args.resume, args.workers)
+        compiler.run_all(limit, args.resume, args.workers, args.spawn_workers)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,139 @@
+"""
+Adaptive concurrency for Runtime spawns.
+
+The Runtime is shared with other tenants, so no fixed spawn concurrency is
+right for long. AIMDController gates requests with a limit that grows by one
+after every healthy window (p95 latency under target, few overload signals,
+demand at the limit) and is cut multiplicatively once overload signals
+(connection errors, 429/5xx) exceed the error threshold. Every change is logged.
+"""
+
+import asyncio
+from collections import deque
+from typing import Deque, List, Optional
+
+TARGET_P95 = 30.0  # seconds
+ERROR_THRESHOLD = 0.05
+INCREASE_STEP = 1
+BACKOFF_FACTOR = 0.5
+MIN_WINDOW = 8  # smallest decision window, in samples
+
+
+def percentile(samples: List[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AIMDController:
+    def __init__(
+        self,
+        initial: int,
+        floor: int,
+        ceiling: int,
+        target_p95: float = TARGET_P95,
+        error_threshold: float = ERROR_THRESHOLD,
+        name: str = "spawn",
+    ):
+        self.floor = max(1, floor)
+        self.ceiling = max(self.floor, ceiling)
+        self.limit = min(self.ceiling, max(self.floor, initial))
+        self.target_p95 = target_p95
+        self.error_threshold = error_threshold
+        self.name = name
+        self.in_flight = 0
+        self.increases = 0
+        self.decreases = 0
+        self.last_p95 = 0.0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._reset_window()
+
+    def _reset_window(self):
+        self._latencies: List[float] = []
+        self._overloaded = 0
+        self._saturated = False
+
+    async def acquire(self):
+        while self.in_flight >= self.limit:
+            self._saturated = True
+            fut = asyncio.get_running_loop().create_future()
+            self._waiters.append(fut)
+            try:
+                await fut
+            except asyncio.CancelledError:
+                # Pass on a wakeup we were given but can no longer use
+                if fut.done() and not fut.cancelled():
+                    self._wake()
+                raise
+            finally:
+                if fut in self._waiters:
+                    self._waiters.remove(fut)
+        self.in_flight += 1
+        if self.in_flight >= self.limit:
+            self._saturated = True
+
+    def release(self, latency: Optional[float], overloaded: bool = False):
+        """Return a slot; ``latency`` is None for requests that were cancelled."""
+        self.in_flight -= 1
+        if latency is not None:
+            self._observe(latency, overloaded)
+        self._wake()
+
+    def _wake(self):
+        free = self.limit - self.in_flight
+        while free > 0 and self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(None)
+                free -= 1
+
+    def _observe(self, latency: float, overloaded: bool):
+        self._latencies.append(latency)
+        self._overloaded += int(overloaded)
+        samples = len(self._latencies)
+        window = max(MIN_WINDOW, self.limit)
+
+        # Back off as soon as the window can no longer come in under threshold
+        if self._overloaded > self.error_threshold * window:
+            self.last_p95 = percentile(self._latencies, 0.95)
+            if self._set_limit(
+                int(self.limit * BACKOFF_FACTOR),
+                f"{self._overloaded}/{samples} overload responses",
+            ):
+                self.decreases += 1
+            self._reset_window()
+            return
+
+        if samples < window:
+            return
+
+        self.last_p95 = percentile(self._latencies, 0.95)
+        if self.last_p95 > self.target_p95:
+            print(
+                f"[AIMD] {self.name} concurrency held at {self.limit}: "
+                f"p95 {self.last_p95:.1f}s over {self.target_p95:g}s target"
+            )
+        elif self._saturated and self.limit < self.ceiling:
+            self._set_limit(
+                self.limit + INCREASE_STEP,
+                f"p95 {self.last_p95:.1f}s, errors {self._overloaded / samples:.0%}",
+            )
+            self.increases += 1
+        self._reset_window()
+
+    def _set_limit(self, limit: int, reason: str) -> bool:
+        limit = min(self.ceiling, max(self.floor, limit))
+        if limit == self.limit:
+            return False
+        print(f"[AIMD] {self.name} concurrency {self.limit} -> {limit} ({reason})")
+        self.limit = limit
+        self._wake()
+        return True
+
+    def summary(self) -> str:
+        return (
+            f"limit {self.limit} (floor {self.floor}, ceiling {self.ceiling}), "
+            f"{self.increases} increases, {self.decreases} decreases, "
+            f"last p95 {self.last_p95:.1f}s"
+        )
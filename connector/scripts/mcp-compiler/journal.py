@@ -0,0 +1,127 @@
+"""
+Append-only checkpoint journal for the MCP compiler.
+
+Every compiled or failed server is appended as one JSON line the moment it
+is recorded, so checkpoint cost is proportional to the result rather than to
+the size of the run. fsync is batched by count and by time. On startup the
+journal is replayed on top of the last materialized mcpCompiled.json /
+failedServers.json, and once those files have been rewritten the journal is
+truncated.
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+FSYNC_EVERY = 50
+FSYNC_SECONDS = 2.0
+
+
+class CompileJournal:
+    def __init__(
+        self,
+        path: Path,
+        fsync_every: int = FSYNC_EVERY,
+        fsync_seconds: float = FSYNC_SECONDS,
+    ):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.fsync_seconds = fsync_seconds
+        self._fh = None
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        if self._fh is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.path, "a", encoding="utf-8")
+        return self._fh
+
+    def append(self, kind: str, record_id: str, record: Optional[dict] = None):
+        """Append one entry; ``kind`` is "compiled" or "failed"."""
+        line = json.dumps(
+            {"kind": kind, "id": record_id, "record": record}, separators=(",", ":")
+        )
+        with self._lock:
+            fh = self._open()
+            fh.write(line + "\n")
+            fh.flush()
+            self._unsynced += 1
+            if (
+                self._unsynced >= self.fsync_every
+                or time.monotonic() - self._last_sync >= self.fsync_seconds
+            ):
+                self._sync_locked()
+
+    def sync(self):
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self):
+        if self._fh is not None and self._unsynced:
+            self._fh.flush()
+            os.fsync(self._fh.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield journal entries in append order, skipping a torn final line."""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if isinstance(entry, dict) and entry.get("id"):
+                    yield entry
+
+    def reset(self):
+        """Drop all entries once they are captured in the materialized output."""
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if self.path.exists():
+                self.path.unlink()
+            self._unsynced = 0
+
+    def close(self):
+        with self._lock:
+            self._sync_locked()
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+
+class CompletionLedger(CompileJournal):
+    """Durable set of registry IDs finished in the current phase 1 run.
+
+    Completion order is arbitrary under the pipeline, so resume cannot rely
+    on a "last processed" cursor. Every compiled, credential-gated or failed
+    server is marked here; a resumed run skips exactly this set.
+    """
+
+    def mark(self, registry_id: str, status: str):
+        self.append(status, registry_id)
+
+    def completed_ids(self) -> set:
+        return {entry["id"] for entry in self.replay()}
+
+
+def write_json_atomic(path: Path, data: Any):
+    """Write pretty JSON to a temp file and rename it over ``path``."""
+    tmp_path = path.with_name(f".{path.name}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
@@ -9,22 +9,95 @@ Generates metadata based on ACTUAL tool information from spawned servers.
 import json
 import os
 import time
-import random
 import re
-from typing import Optional, List, Dict, Any
+import threading
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from email.utils import parsedate_to_datetime
+from typing import Optional, List, Dict, Any, Tuple, Union
 from dataclasses import dataclass
-from openai import OpenAI, APIError, RateLimitError, APITimeoutError
+import httpx
+from openai import (
+    OpenAI,
+    APIError,
+    RateLimitError,
+    APITimeoutError,
+    APIConnectionError,
+    InternalServerError,
+    DefaultHttpxClient,
+)
 from dotenv import load_dotenv
 
+from batcher import Batcher
+from breaker import BreakerRegistry, CircuitOpenError
+from classifier import TagClassifier, tokenize
+from cache import SqliteCache, content_key
+from singleflight import SingleFlight
+
 load_dotenv()
 
-ASI_BASE_URL = "https://inference.asicloud.cudos.org/v1"
+ASI_BASE_URL = os.environ.get(
+    "ASI_BASE_URL", "https://inference.asicloud.cudos.org/v1"
+)
 ASI_API_KEY = os.environ.get("ASI_INFERENCE_API_KEY")
 
 MAX_RETRIES = 3
 BASE_RETRY_DELAY = 1.0
 MAX_RETRY_DELAY = 10.0
 
+LLM_TIMEOUT = 30.0
+TEMPERATURE = 0.1
+SYSTEM_PROMPT = "You are a JSON metadata generator. Output ONLY valid JSON, no thinking, no markdown, no explanation. Start with {"
+FALLBACK_SYSTEM_PROMPT = "You are a JSON metadata generator. Output ONLY valid JSON."
+LLM_MAX_CONNECTIONS = int(os.environ.get("LLM_MAX_CONNECTIONS", "16"))
+LLM_MAX_KEEPALIVE = int(os.environ.get("LLM_MAX_KEEPALIVE", "8"))
+
+# Defaults for models without their own "rps"/"tpm" in LLMService.BACKENDS
+LLM_RPS = float(os.environ.get("LLM_RPS", "2.0"))
+LLM_TPM = float(os.environ.get("LLM_TPM", "120000"))
+RATE_RECOVERY_STEP = 0.05  # fraction of the ceiling regained per success
+RATE_MIN_FRACTION = 0.1  # never throttle below 10% of the ceiling
+
+# Backend scheduling: EWMA smoothing and the latency assumed before the first
+# sample, so idle backends get explored instead of starved
+LATENCY_ALPHA = 0.3
+ERROR_ALPHA = 0.2
+INITIAL_LATENCY = 2.0
+ERROR_PENALTY = 4.0
+PROBE_INTERVAL = 30.0  # re-sample an idle backend whose estimate may be stale
+
+# Hedging: duplicate a request that outlives its backend's p90 latency, as
+# long as hedges stay under LLM_HEDGE_BUDGET of all requests
+LLM_HEDGE_BUDGET = float(os.environ.get("LLM_HEDGE_BUDGET", "0.1"))
+HEDGE_PERCENTILE = 0.9
+HEDGE_MIN_SAMPLES = 10  # before that, hedge after HEDGE_DEFAULT_DELAY
+HEDGE_DEFAULT_DELAY = LLM_TIMEOUT / 3
+# Pool threads per LLM worker: its primary, its hedge and a loser winding down
+HEDGE_THREADS_PER_WORKER = 3
+HEDGE_THREADS = 64  # until size_hedge_pool() is told the worker count
+LATENCY_WINDOW = 200
+
+# Batching: up to LLM_BATCH_SIZE servers per request, fewer if they would not
+# fit in BATCH_CONTEXT_SHARE of the backend's context window
+LLM_BATCH_SIZE = int(os.environ.get("LLM_BATCH_SIZE", "16"))
+LLM_BATCH_LINGER = float(os.environ.get("LLM_BATCH_LINGER", "0.2"))
+BATCH_CONTEXT_SHARE = 0.5
+BATCH_OUTPUT_TOKENS = 160  # per server
+REASONING_TOKENS = 2048
+
+# Compact prompts: tool lines are packed into each backend's "prompt_tokens"
+# budget, most informative first, instead of the first 20 tools
+COMPACT_DESC_CHARS = 160
+
+# A prompt, or one prompt per model when compaction gives each scheduled
+# backend its own budget
+Prompt = Union[str, Dict[str, str]]
+
+# Per-model circuit breakers: consecutive connection errors, timeouts or 5xx
+LLM_BREAKER_THRESHOLD = int(os.environ.get("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_COOLDOWN = float(os.environ.get("LLM_BREAKER_COOLDOWN", "30"))
+
 
 @dataclass
 class CleanedMetadata:
@@ -33,6 +106,570 @@ class CleanedMetadata:
     tags: list[str]
 
 
+class _CountedStream(httpx.SyncByteStream):
+    """Response body that reports back once it is closed."""
+
+    def __init__(self, stream: httpx.SyncByteStream, on_close):
+        self._stream = stream
+        self._on_close = on_close
+        self._closed = False
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._stream.close()
+        finally:
+            self._on_close()
+
+
+class CountingTransport(httpx.HTTPTransport):
+    """HTTP transport that counts its in-use and idle connections.
+
+    A connection is in use from the moment a request is sent until its
+    response body is closed. Open connections are tracked through the ``network_stream``
+    response extension, so nothing reaches into the private pool.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._streams: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self._in_use += 1
+        try:
+            response = super().handle_request(request)
+        except BaseException:
+            self._release()
+            raise
+        stream = response.extensions.get("network_stream")
+        if stream is not None:
+            with self._lock:
+                self._streams.add(stream)
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=_CountedStream(response.stream, self._release),
+            extensions=response.extensions,
+        )
+
+    def _release(self):
+        with self._lock:
+            self._in_use -= 1
+
+    def connections(self) -> Tuple[int, int]:
+        """(in use, idle) connections right now."""
+        with self._lock:
+            streams = list(self._streams)
+            in_use = self._in_use
+        open_count = 0
+        for stream in streams:
+            sock = stream.get_extra_info("socket")
+            if sock is None or sock.fileno() != -1:
+                open_count += 1
+        return in_use, max(0, open_count - in_use)
+
+
+class ClientRegistry:
+    """Process-wide OpenAI clients keyed by (model, base URL).
+
+    OpenAI clients are thread-safe, so every compiler worker shares one
+    client - and one bounded HTTP connection pool - per backend instead of
+    building a new client and TLS session for each server.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = LLM_MAX_CONNECTIONS,
+        max_keepalive: int = LLM_MAX_KEEPALIVE,
+    ):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], OpenAI] = {}
+        self._transports: Dict[Tuple[str, str], CountingTransport] = {}
+
+    def get(self, model: str, base_url: str = ASI_BASE_URL) -> OpenAI:
+        key = (model, base_url)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                transport = CountingTransport(limits=self.limits())
+                # Retries live in LLMService._call_llm so that 429s reach the
+                # shared rate limiter instead of being retried per thread
+                client = OpenAI(
+                    api_key=ASI_API_KEY,
+                    base_url=base_url,
+                    timeout=LLM_TIMEOUT,
+                    max_retries=0,
+                    http_client=DefaultHttpxClient(transport=transport),
+                )
+                self._clients[key] = client
+                self._transports[key] = transport
+            return client
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+        )
+
+    def live_connections(self) -> Dict[str, Dict[str, int]]:
+        """In-use and idle connections per model across all pooled clients."""
+        counts: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            transports = list(self._transports.items())
+        for (model, _), transport in transports:
+            in_use, idle = transport.connections()
+            entry = counts.setdefault(model, {"in_use": 0, "idle": 0})
+            entry["in_use"] += in_use
+            entry["idle"] += idle
+        return counts
+
+    def close(self):
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+            self._transports.clear()
+        for client in clients:
+            client.close()
+
+
+CLIENTS = ClientRegistry()
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Read Retry-After (or retry-after-ms) from an API error response."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """Token bucket for one model: requests/sec and tokens/min.
+
+    Callers acquire capacity before sending. A 429 halves the request rate
+    and pauses every caller until Retry-After has passed; each success
+    recovers a step towards the configured ceiling.
+    """
+
+    def __init__(self, rps: float, tpm: float):
+        self.max_rps = rps
+        self.rps = rps
+        self.tpm = tpm
+        self._requests = 1.0
+        self._tokens = tpm
+        self._paused_until = 0.0
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+        self.sent = 0
+        self.throttled = 0
+        self.waited_s = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self._last
+        self._last = now
+        # Burst of one second's worth of requests at the current rate
+        self._requests = min(max(self.rps, 1.0), self._requests + elapsed * self.rps)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def acquire(self, tokens: int):
+        tokens = min(tokens, self.tpm)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self._paused_until - now
+                if wait <= 0:
+                    wait = max(
+                        (1 - self._requests) / self.rps,
+                        (tokens - self._tokens) * 60 / self.tpm,
+                    )
+                    if wait <= 0:
+                        self._requests -= 1
+                        self._tokens -= tokens
+                        self.sent += 1
+                        self.waited_s += now - started
+                        return
+            time.sleep(min(wait, 1.0))
+
+    def on_success(self, estimated_tokens: int, used_tokens: Optional[int]):
+        with self._lock:
+            if used_tokens is not None:
+                refund = estimated_tokens - used_tokens
+                self._tokens = min(self.tpm, self._tokens + refund)
+            self.rps = min(self.max_rps, self.rps + self.max_rps * RATE_RECOVERY_STEP)
+
+    def on_rate_limited(self, retry_after: Optional[float]):
+        with self._lock:
+            self.throttled += 1
+            self.rps = max(self.max_rps * RATE_MIN_FRACTION, self.rps / 2)
+            if retry_after is None:
+                retry_after = min(1 / self.rps, MAX_RETRY_DELAY)
+            self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+
+    def summary(self) -> str:
+        return (
+            f"{self.sent} sent, {self.throttled} throttled, "
+            f"{self.rps:.2f}/{self.max_rps:.2f} req/s, waited {self.waited_s:.1f}s"
+        )
+
+
+class BackendStats:
+    def __init__(self, weight: float = 1.0):
+        self.weight = weight
+        self.in_flight = 0
+        self.latency = INITIAL_LATENCY
+        self.error_rate = 0.0
+        self.completed = 0
+        self.failed = 0
+        self.busy_s = 0.0
+        self.last_used = 0.0
+        self.samples: deque = deque(maxlen=LATENCY_WINDOW)
+
+    def score(self) -> float:
+        """Expected wait for one more request; lower is better."""
+        return (
+            (self.in_flight + 1)
+            * self.latency
+            * (1 + ERROR_PENALTY * self.error_rate)
+            / max(self.weight, 1e-6)
+        )
+
+
+class BackendScheduler:
+    """Route each LLM request to the backend with the best current score.
+
+    The score combines in-flight requests, EWMA latency and recent error
+    rate, divided by an optional per-backend weight, so a slow reasoning
+    model takes proportionally less of the queue instead of a fixed third.
+    """
+
+    def __init__(self, backends: List[Dict[str, Any]]):
+        self.backends = list(backends)
+        self._stats = {
+            b["model"]: BackendStats(b.get("weight", 1.0)) for b in self.backends
+        }
+        self._lock = threading.Lock()
+        self._started: Optional[float] = None
+
+    def set_weights(self, weights: Dict[str, float]):
+        with self._lock:
+            for model, weight in weights.items():
+                if model in self._stats:
+                    self._stats[model].weight = weight
+
+    def acquire(self, exclude: Optional[set] = None) -> Dict[str, Any]:
+        """Pick a backend, avoiding models in ``exclude`` unless that is all of them."""
+        with self._lock:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            backends = [
+                b for b in self.backends if b["model"] not in (exclude or ())
+            ] or self.backends
+            stale = [
+                b
+                for b in backends
+                if self._stats[b["model"]].in_flight == 0
+                and now - self._stats[b["model"]].last_used > PROBE_INTERVAL
+                and self._stats[b["model"]].weight > 0
+            ]
+            backend = min(
+                stale or backends, key=lambda b: self._stats[b["model"]].score()
+            )
+            stats = self._stats[backend["model"]]
+            stats.in_flight += 1
+            stats.last_used = now
+            return backend
+
+    def release(self, backend: Dict[str, Any], latency: float, ok: bool):
+        with self._lock:
+            stats = self._stats[backend["model"]]
+            stats.in_flight -= 1
+            stats.busy_s += latency
+            if ok:
+                stats.samples.append(latency)
+            stats.latency += LATENCY_ALPHA * (latency - stats.latency)
+            stats.error_rate += ERROR_ALPHA * ((0.0 if ok else 1.0) - stats.error_rate)
+            if ok:
+                stats.completed += 1
+            else:
+                stats.failed += 1
+
+    def latency_percentile(self, model: str, q: float) -> Optional[float]:
+        """Recent successful latency percentile, or None without enough samples."""
+        with self._lock:
+            stats = self._stats.get(model)
+            if stats is None or len(stats.samples) < HEDGE_MIN_SAMPLES:
+                return None
+            ordered = sorted(stats.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> Dict[str, str]:
+        with self._lock:
+            elapsed = time.monotonic() - self._started if self._started else 0.0
+            return {
+                model: (
+                    f"{s.completed} ok, {s.failed} failed, "
+                    f"{s.completed / elapsed if elapsed else 0.0:.2f} servers/s, "
+                    f"ewma {s.latency:.1f}s, errors {s.error_rate:.0%}, "
+                    f"weight {s.weight:g}"
+                )
+                for model, s in self._stats.items()
+            }
+
+
+class HedgeBudget:
+    """Caps hedged duplicates at a fraction of all requests."""
+
+    def __init__(self, ratio: float):
+        self.ratio = ratio
+        self.requests = 0
+        self.hedges = 0
+        self.hedges_won = 0
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def try_hedge(self) -> bool:
+        with self._lock:
+            if self.hedges + 1 > self.ratio * self.requests:
+                return False
+            self.hedges += 1
+            return True
+
+    def on_hedge_won(self):
+        with self._lock:
+            self.hedges_won += 1
+
+    def summary(self) -> str:
+        with self._lock:
+            share = self.hedges / self.requests if self.requests else 0.0
+            return (
+                f"{self.hedges} hedges for {self.requests} requests "
+                f"({share:.0%} of {self.ratio:.0%} budget), {self.hedges_won} won"
+            )
+
+
+class JsonObjectScanner:
+    """Finds complete top-level JSON objects in a stream of text chunks.
+
+    Brace depth is only tracked outside strings, so braces inside values do
+    not end an object early. Text outside any object (reasoning preambles,
+    markdown fences) is skipped.
+    """
+
+    def __init__(self):
+        self._parts: List[str] = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+
+    def feed(self, chunk: str) -> List[str]:
+        objects = []
+        start = 0
+        for i, ch in enumerate(chunk):
+            if self._depth == 0:
+                if ch == "{":
+                    self._depth = 1
+                    start = i
+                continue
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._parts.append(chunk[start : i + 1])
+                    objects.append("".join(self._parts))
+                    self._parts = []
+        if self._depth > 0:
+            self._parts.append(chunk[start:])
+        return objects
+
+
+@dataclass
+class StreamedCompletion:
+    content: str
+    result: Optional[Dict[str, Any]]  # first valid metadata object, if any
+    closed_early: bool
+    total_tokens: Optional[int]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough local token count, about four characters per token."""
+    return (len(text) + 3) // 4
+
+
+def compact_tool_list(
+    tools: List[Dict[str, Any]], budget: int
+) -> Tuple[List[str], int]:
+    """Pack as many tool lines as fit into ``budget`` tokens.
+
+    Exact repeats (same name and description once case and whitespace are
+    normalised) are dropped. The rest first get name-only lines, taken
+    greedily by how many name words (and leading verbs) they add that
+    earlier picks did not, until the budget is spent; what is left then adds
+    descriptions in the same order. Returns the lines in the server's own
+    order and the number of repeats dropped.
+    """
+    entries = []
+    seen = set()
+    duplicates = 0
+    for index, tool in enumerate(tools):
+        name = str(tool.get("name", "unknown"))
+        desc = " ".join(str(tool.get("description") or "").split())
+        key = (name.lower(), desc.lower())
+        if key in seen:
+            duplicates += 1
+            continue
+        seen.add(key)
+        entries.append((index, name, desc[:COMPACT_DESC_CHARS], tokenize(name)))
+
+    covered: set = set()
+    verbs: set = set()
+    picked = []
+    used = 0
+    while entries:
+        best = max(
+            entries,
+            key=lambda e: (
+                len(set(e[3]) - covered) + (bool(e[3]) and e[3][0] not in verbs),
+                bool(e[2]),
+                -e[0],
+            ),
+        )
+        entries.remove(best)
+        # Two tokens or so for the number and newline
+        cost = estimate_tokens(best[1]) + 2
+        if used + cost > budget:
+            continue
+        picked.append(best)
+        used += cost
+        covered.update(best[3])
+        verbs.update(best[3][:1])
+
+    chosen = {index: name for index, name, _, _ in picked}
+    for index, name, desc, _ in picked:
+        if not desc:
+            continue
+        line = f"{name}: {desc}"
+        extra = estimate_tokens(line) - estimate_tokens(name)
+        if used + extra <= budget:
+            chosen[index] = line
+            used += extra
+    return [chosen[i] for i in sorted(chosen)], duplicates
+
+
+class PromptStats:
+    def __init__(self):
+        self.prompts = 0
+        self.tokens = 0
+        self.legacy_tokens = 0
+        self.tools = 0
+        self.shown = 0
+        self.duplicates = 0
+        self._lock = threading.Lock()
+
+    def record(
+        self, tokens: int, legacy_tokens: int, tools: int, shown: int, dups: int
+    ):
+        with self._lock:
+            self.prompts += 1
+            self.tokens += tokens
+            self.legacy_tokens += legacy_tokens
+            self.tools += tools
+            self.shown += shown
+            self.duplicates += dups
+
+    def summary(self) -> str:
+        with self._lock:
+            if not self.prompts:
+                return "no prompts"
+            saved = 1 - self.tokens / self.legacy_tokens if self.legacy_tokens else 0.0
+            return (
+                f"{self.prompts} prompts, avg {self.tokens / self.prompts:.0f} "
+                f"tool-list tokens vs {self.legacy_tokens / self.prompts:.0f} "
+                f"uncompacted ({saved:.0%} saved), {self.shown}/{self.tools} tools "
+                f"shown, {self.duplicates} exact duplicates dropped"
+            )
+
+
+class StreamStats:
+    def __init__(self):
+        self.streamed = 0
+        self.closed_early = 0
+        self.output_chars = 0
+        self._lock = threading.Lock()
+
+    def record(self, completion: StreamedCompletion):
+        with self._lock:
+            self.streamed += 1
+            self.closed_early += int(completion.closed_early)
+            self.output_chars += len(completion.content)
+
+    def summary(self) -> str:
+        with self._lock:
+            avg = self.output_chars / self.streamed if self.streamed else 0.0
+            return (
+                f"{self.streamed} streamed, {self.closed_early} closed early, "
+                f"avg {avg:.0f} output chars"
+            )
+
+
+class RateLimiterRegistry:
+    """Process-wide limiters keyed by model, configured from BACKENDS."""
+
+    def __init__(self, backends: List[Dict[str, Any]]):
+        self._config = {
+            b["model"]: (b.get("rps", LLM_RPS), b.get("tpm", LLM_TPM)) for b in backends
+        }
+        self._limiters: Dict[str, RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model: str) -> RateLimiter:
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                rps, tpm = self._config.get(model, (LLM_RPS, LLM_TPM))
+                limiter = self._limiters[model] = RateLimiter(rps, tpm)
+            return limiter
+
+    def summary(self) -> Dict[str, str]:
+        with self._lock:
+            return {m: l.summary() for m, l in self._limiters.items()}
+
+
 class LLMService:
     BANNED_TAGS = {
         "mcp",
@@ -179,27 +816,80 @@ class LLMService:
             "provider": "qwen",
             "model": "qwen/qwen3-32b",
             "fallback": "meta-llama/llama-3.3-70b-instruct",
+            "context": 40960,
+            "prompt_tokens": 1200,
+            "rps": LLM_RPS,
+            "tpm": LLM_TPM,
         },
         {
             "provider": "nousresearch",
             "model": "nousresearch/hermes-4-70b",
             "fallback": "meta-llama/llama-3.3-70b-instruct",
+            "context": 131072,
+            "prompt_tokens": 1600,
+            "rps": LLM_RPS,
+            "tpm": LLM_TPM,
         },
         {
             "provider": "minimax",
             "model": "minimax/minimax-m2.1",
             "fallback": "qwen/qwen3-32b",
+            "context": 196608,
+            "prompt_tokens": 1600,
+            "rps": LLM_RPS,
+            "tpm": LLM_TPM,
         },
     ]
 
-    def __init__(self, backend_name: Optional[str] = None):
-        self.backend = self._select_backend(backend_name)
-        self.client = OpenAI(
-            api_key=ASI_API_KEY,
-            base_url=ASI_BASE_URL,
-            timeout=30.0,
-            max_retries=2,
+    def __init__(
+        self,
+        backend_name: Optional[str] = None,
+        clients: Optional[ClientRegistry] = None,
+        rate_limits: Optional[RateLimiterRegistry] = None,
+        scheduler: Optional[BackendScheduler] = None,
+        cache: Optional[SqliteCache] = None,
+        breakers: Optional[BreakerRegistry] = None,
+        hedge_budget: Optional[float] = None,
+        stream: bool = False,
+        batch_size: int = 0,
+        fast_path: bool = False,
+        compact_prompts: bool = False,
+    ):
+        # Without an explicit backend every request is routed by the scheduler
+        self.backend = self._select_backend(backend_name) if backend_name else None
+        self.clients = clients or CLIENTS
+        self.rate_limits = rate_limits or RATE_LIMITS
+        self.scheduler = scheduler or SCHEDULER
+        self.cache = cache
+        self.breakers = breakers or LLM_BREAKERS
+        self.flights = SingleFlight()
+        # Hedging is off unless a budget is given
+        self.hedges = HedgeBudget(hedge_budget) if hedge_budget else None
+        self._hedge_pool: Optional[ThreadPoolExecutor] = None
+        self._hedge_threads = HEDGE_THREADS
+        self._hedge_lock = threading.Lock()
+        # Streaming stops reading once a valid metadata object has closed
+        self.stream = stream
+        self.stream_stats = StreamStats()
+        # Batching packs concurrent requests into one call per backend
+        self.batcher = (
+            Batcher(self._run_batch, batch_size, LLM_BATCH_LINGER)
+            if batch_size > 1
+            else None
         )
+        # Servers whose tags are obvious from their names skip the LLM
+        self.classifier = (
+            TagClassifier(
+                self.VALID_TAGS,
+                self.BANNED_TAGS,
+                validate=lambda data: self._parse_json_response(json.dumps(data)),
+            )
+            if fast_path
+            else None
+        )
+        # Tool lists are packed into each backend's prompt budget
+        self.compact_prompts = compact_prompts
+        self.prompt_stats = PromptStats()
 
     def _select_backend(self, name: Optional[str] = None) -> Dict[str, str]:
         for b in self.BACKENDS:
@@ -217,28 +907,94 @@ class LLMService:
         namespace: str,
         repo_url: str,
         tools: List[Dict[str, Any]],
+        budget: Optional[int] = None,
+        record: bool = True,
+    ) -> str:
+        prompt = f"""Generate professional metadata for this MCP server based on its ACTUAL tools.
+
+SERVER INFO:
+{self._tools_section(original_name, namespace, repo_url, tools, budget, record)}
+
+TASK: Create clean metadata that accurately describes what this server does based on the tools above.
+
+RULES:
+
+{self._tools_rules()}
+
+Return ONLY valid JSON (no markdown):
+{{"name": "Name", "description": "Sentence one. Sentence two.", "tags": ["tag1", "tag2"]}}"""
+
+        return prompt
+
+    def _tools_section(
+        self,
+        original_name: str,
+        namespace: str,
+        repo_url: str,
+        tools: List[Dict[str, Any]],
+        budget: Optional[int] = None,
+        record: bool = True,
     ) -> str:
         tools_text = "\n\nDISCOVERED TOOLS (from spawning the server):"
+        if budget is not None:
+            tools_text += self._compact_tools_text(tools, budget, record)
+        else:
+            tools_text += self._legacy_tools_text(tools)
+
+        return f"""- Original Name: "{original_name}"
+- Author: {namespace}
+- Repository: {repo_url}{tools_text}"""
+
+    @staticmethod
+    def _legacy_tools_text(tools: List[Dict[str, Any]]) -> str:
+        """The uncompacted tool list: first 20 tools, descriptions cut at 200."""
+        text = ""
         for i, t in enumerate(tools[:20], 1):
             name = t.get("name", "unknown")
             desc = t.get("description", "")
             if desc:
-                tools_text += f"\n{i}. {name}: {desc[:200]}"
+                text += f"\n{i}. {name}: {desc[:200]}"
             else:
-                tools_text += f"\n{i}. {name}"
-
-        prompt = f"""Generate professional metadata for this MCP server based on its ACTUAL tools.
-
-SERVER INFO:
-- Original Name: "{original_name}"
-- Author: {namespace}
-- Repository: {repo_url}{tools_text}
+                text += f"\n{i}. {name}"
+        return text
 
-TASK: Create clean metadata that accurately describes what this server does based on the tools above.
+    def _compact_tools_text(
+        self, tools: List[Dict[str, Any]], budget: int, record: bool = True
+    ) -> str:
+        lines, duplicates = compact_tool_list(tools, budget)
+        text = "".join(f"\n{i}. {line}" for i, line in enumerate(lines, 1))
+        hidden = len(tools) - duplicates - len(lines)
+        if hidden:
+            text += f"\n(+{hidden} more tools not shown)"
+        if not record:
+            return text
+
+        self.prompt_stats.record(
+            estimate_tokens(text),
+            estimate_tokens(self._legacy_tools_text(tools)),
+            len(tools),
+            len(lines),
+            duplicates,
+        )
+        return text
 
-RULES:
+    def _tools_budget(
+        self,
+        server_id: str,
+        original_name: str,
+        namespace: str,
+        repo_url: str,
+        backend: Dict[str, str],
+    ) -> int:
+        """Tokens left for the tool list once the rest of the prompt is in."""
+        total = backend.get("prompt_tokens", 1200)
+        fixed = self._build_prompt_from_tools(
+            server_id, original_name, namespace, repo_url, []
+        )
+        return max(0, total - estimate_tokens(fixed))
 
-1. NAME (2-6 words, Title Case):
+    def _tools_rules(self) -> str:
+        return f"""1. NAME (2-6 words, Title Case):
    - Remove: "MCP", "Server", "by [author]", "| Glama", "| PulseMCP"
    - Describe the core functionality based on tools
    - Examples: "GitHub Repository Access", "PostgreSQL Query Engine", "Echo Testing Utilities"
@@ -253,16 +1009,34 @@ RULES:
    - FORBIDDEN: mcp, server, tool, api, client, wrapper, helper, utility
    - Choose tags that match the domain/functionality of the tools
    - Available tags: {", ".join(self.VALID_TAGS[:30])}
-   - Or create appropriate domain-specific tags
+   - Or create appropriate domain-specific tags"""
 
-Return ONLY valid JSON (no markdown):
+    def _build_prompt_from_repo(
+        self,
+        server_id: str,
+        original_name: str,
+        namespace: str,
+        repo_url: str,
+        original_desc: str,
+    ) -> str:
+        prompt = f"""Generate professional metadata for this software package.
+
+PACKAGE INFO:
+{self._repo_section(original_name, namespace, repo_url, original_desc)}
+
+The server could not be spawned. Infer functionality from the repository name.
+
+RULES:
+
+{self._repo_rules()}
+
+Return ONLY valid JSON:
 {{"name": "Name", "description": "Sentence one. Sentence two.", "tags": ["tag1", "tag2"]}}"""
 
         return prompt
 
-    def _build_prompt_from_repo(
+    def _repo_section(
         self,
-        server_id: str,
         original_name: str,
         namespace: str,
         repo_url: str,
@@ -280,21 +1054,15 @@ Return ONLY valid JSON (no markdown):
             parts = repo_url.rstrip("/").split("/")
             repo_name = parts[-1] if parts else ""
 
-        prompt = f"""Generate professional metadata for this software package.
-
-PACKAGE INFO:
-- Original Name: "{original_name}"
+        return f"""- Original Name: "{original_name}"
 - Name Hint: "{clean_name}"
 - Repository Name: "{repo_name}"
 - Author: {namespace}
 - Repository: {repo_url}
-- Original Description: "{original_desc}"
+- Original Description: "{original_desc}\""""
 
-The server could not be spawned. Infer functionality from the repository name.
-
-RULES:
-
-1. NAME (2-6 words, Title Case):
+    def _repo_rules(self) -> str:
+        return """1. NAME (2-6 words, Title Case):
    - Derive from repository name
    - Example: "cocktails-rag-mcp" -> "Cocktails Recipe Search"
    - Remove: "MCP", "Server", "-mcp" suffix
@@ -306,50 +1074,391 @@ RULES:
 3. TAGS (2-4 specific lowercase tags):
    - FORBIDDEN: mcp, server, tool, api, client, wrapper, helper, utility
    - Infer from repository name
-   - Example: "cocktails-rag-mcp" -> ["recipes", "search", "food"]
+   - Example: "cocktails-rag-mcp" -> ["recipes", "search", "food"]"""
 
-Return ONLY valid JSON:
-{{"name": "Name", "description": "Sentence one. Sentence two.", "tags": ["tag1", "tag2"]}}"""
+    def _build_batch_prompt(self, kind: str, sections: List[str]) -> str:
+        servers = "\n\n".join(
+            f"SERVER {i}:\n{section}" for i, section in enumerate(sections, 1)
+        )
+        if kind == "tools":
+            intro = f"Generate professional metadata for each of these {len(sections)} MCP servers based on their ACTUAL tools."
+            task = "TASK: For every server, create clean metadata that accurately describes what it does based on its tools."
+            rules = self._tools_rules()
+        else:
+            intro = f"Generate professional metadata for each of these {len(sections)} software packages."
+            task = "These servers could not be spawned. Infer each one's functionality from its repository name."
+            rules = self._repo_rules()
 
-        return prompt
+        return f"""{intro}
+
+{servers}
+
+{task}
+
+RULES (apply to every server):
+
+{rules}
+
+Return ONLY valid JSON (no markdown) with one result per server, using its number as "id":
+{{"results": [{{"id": 1, "name": "Name", "description": "Sentence one. Sentence two.", "tags": ["tag1", "tag2"]}}]}}"""
+
+    def _create_completion(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        stream: bool = False,
+        cancel: Optional[threading.Event] = None,
+    ):
+        """Send one chat completion once the breaker and rate limiter allow it.
+
+        With ``stream`` the result is a StreamedCompletion instead.
+        """
+        breaker = self.breakers.get(model)
+        ticket = breaker.allow()
+        if not ticket:
+            raise CircuitOpenError(f"Circuit open for {model}")
+
+        limiter = self.rate_limits.get(model)
+        estimated = sum(len(m["content"]) for m in messages) // 4 + max_tokens
+        healthy = None
+        try:
+            limiter.acquire(estimated)
+            response = self.clients.get(model).chat.completions.create(
+                model=model,
+                messages=messages,
+                temperature=TEMPERATURE,
+                max_tokens=max_tokens,
+                response_format={"type": "json_object"},
+                stream=stream,
+            )
+            if stream:
+                response = self._read_stream(response, estimated - max_tokens, cancel)
+            healthy = True
+        except RateLimitError as e:
+            limiter.on_rate_limited(retry_after_seconds(e))
+            raise
+        except (APIConnectionError, InternalServerError):
+            healthy = False
+            raise
+        finally:
+            breaker.record(ticket, healthy)
+        if stream:
+            limiter.on_success(estimated, response.total_tokens)
+            self.stream_stats.record(response)
+        else:
+            usage = getattr(response, "usage", None)
+            limiter.on_success(estimated, getattr(usage, "total_tokens", None))
+        return response
+
+    def _read_stream(
+        self, stream, prompt_tokens: int, cancel: Optional[threading.Event]
+    ) -> StreamedCompletion:
+        """Consume a streamed completion, closing it at the first valid object."""
+        scanner = JsonObjectScanner()
+        parts: List[str] = []
+        result = None
+        usage = None
+        closed_early = False
+        try:
+            for chunk in stream:
+                usage = getattr(chunk, "usage", None) or usage
+                if cancel is not None and cancel.is_set():
+                    closed_early = True
+                    break
+                if not chunk.choices:
+                    continue
+                text = chunk.choices[0].delta.content
+                if not text:
+                    continue
+                parts.append(text)
+                for candidate in scanner.feed(text):
+                    result = self._parse_json_response(candidate)
+                    if result is not None:
+                        break
+                if result is not None:
+                    closed_early = True
+                    break
+        finally:
+            stream.close()
+
+        content = "".join(parts)
+        total = getattr(usage, "total_tokens", None)
+        if total is None:
+            # Closed streams report no usage; approximate what was generated
+            total = prompt_tokens + len(content) // 4
+        return StreamedCompletion(content, result, closed_early, total)
+
+    def _complete(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        max_tokens: int,
+        is_reasoning_model: bool,
+        cancel: Optional[threading.Event] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """One completion parsed into metadata, streamed if enabled.
+
+        A valid result is cached under the model and system prompt that
+        actually produced it.
+        """
+        result = None
+        if self.stream:
+            completion = self._create_completion(
+                model, messages, max_tokens, stream=True, cancel=cancel
+            )
+            result = completion.result
+            content = completion.content
+        else:
+            response = self._create_completion(model, messages, max_tokens)
+            content = response.choices[0].message.content
+        if result is None and content:
+            result = self._parse_json_response(content, is_reasoning_model)
+        if result is not None and self.cache is not None:
+            system, prompt = messages[0]["content"], messages[1]["content"]
+            self.cache.put(self._cache_key(model, system, prompt), result)
+        return result
+
+    @staticmethod
+    def _prompt_for(prompt: Prompt, backend: Dict[str, str]) -> str:
+        """The prompt as sent to ``backend``."""
+        if isinstance(prompt, str):
+            return prompt
+        return prompt[backend["model"]]
+
+    @staticmethod
+    def _cache_key(model: str, system_prompt: str, prompt: str) -> str:
+        return content_key(model, system_prompt, prompt, TEMPERATURE)
+
+    def _candidate_keys(self, backend: Dict[str, str], prompt: str) -> List[str]:
+        """Every (model, system prompt) pair a call on ``backend`` may send."""
+        keys = [self._cache_key(backend["model"], SYSTEM_PROMPT, prompt)]
+        fallback = backend.get("fallback")
+        if fallback and fallback != backend["model"]:
+            keys.append(self._cache_key(fallback, SYSTEM_PROMPT, prompt))
+            keys.append(self._cache_key(fallback, FALLBACK_SYSTEM_PROMPT, prompt))
+        return keys
 
     def _call_llm(
-        self, prompt: str, backend: Dict[str, str]
+        self, prompt: Prompt, backend: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        # Identical prompts in flight at once share one completion
+        text = prompt if isinstance(prompt, str) else tuple(sorted(prompt.items()))
+        key = (backend["model"] if backend else None, text)
+        result, _ = self.flights.do(key, lambda: self._call_llm_once(prompt, backend))
+        return result
+
+    def _cached(
+        self, prompt: Prompt, backend: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        if self.cache is None:
+            return None
+        # A scheduled request may land on any backend, so accept a cached
+        # answer from whichever one produced it last time
+        candidates = [backend] if backend else self.scheduler.backends
+        return self.cache.get_first(
+            [
+                key
+                for b in candidates
+                for key in self._candidate_keys(b, self._prompt_for(prompt, b))
+            ]
+        )
+
+    def _call_llm_once(
+        self, prompt: Prompt, backend: Optional[Dict[str, str]] = None
+    ) -> Optional[Dict[str, Any]]:
+        cached = self._cached(prompt, backend)
+        if cached is not None:
+            return cached
+
+        scheduled = backend is None
+        tripped = set()
+        if scheduled:
+            tripped = {
+                b["model"]
+                for b in self.scheduler.backends
+                if not self.breakers.get(b["model"]).available()
+            }
+            if len(tripped) == len(self.scheduler.backends):
+                raise CircuitOpenError("Circuit open for every LLM backend")
+            backend = self.scheduler.acquire(exclude=tripped)
+
+        if self.hedges is not None:
+            return self._call_hedged(prompt, backend, scheduled, tripped)
+        return self._attempt(prompt, backend, scheduled)
+
+    def size_hedge_pool(self, llm_workers: int):
+        """Give every LLM worker room for a primary and a hedge at once.
+
+        Primaries run in the pool too, so a winning hedge can return without
+        waiting on a blocking non-streamed primary; a pool smaller than the
+        worker count would queue primaries behind each other.
+        """
+        threads = max(1, llm_workers) * HEDGE_THREADS_PER_WORKER
+        with self._hedge_lock:
+            if threads == self._hedge_threads:
+                return
+            self._hedge_threads = threads
+            if self._hedge_pool is not None:
+                self._hedge_pool.shutdown(wait=False)
+                self._hedge_pool = None
+
+    def _hedge_executor(self) -> ThreadPoolExecutor:
+        # Every LLM worker thread may be the first to hedge
+        with self._hedge_lock:
+            if self._hedge_pool is None:
+                self._hedge_pool = ThreadPoolExecutor(
+                    max_workers=self._hedge_threads, thread_name_prefix="llm-hedge"
+                )
+            return self._hedge_pool
+
+    def _attempt(
+        self,
+        prompt: Prompt,
+        backend: Dict[str, str],
+        scheduled: bool,
+        cancel: Optional[threading.Event] = None,
+        sent: Optional[threading.Event] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Run one request on ``backend``, releasing its scheduler slot if held."""
+        if sent is not None:
+            sent.set()
+        started = time.monotonic()
+        result = None
+        try:
+            result = self._call_backend(
+                self._prompt_for(prompt, backend), backend, cancel
+            )
+        finally:
+            if scheduled:
+                self.scheduler.release(
+                    backend, time.monotonic() - started, result is not None
+                )
+        return result
+
+    def _hedge_target(
+        self, primary: Dict[str, str], scheduled: bool, tripped: set
+    ) -> Tuple[Optional[Dict[str, str]], bool]:
+        """Another scheduled backend if there is one, else the primary's fallback.
+
+        The fallback is sent the primary's prompt under FALLBACK_SYSTEM_PROMPT,
+        as _call_backend does once the primary's retries run out.
+        """
+        if scheduled:
+            exclude = tripped | {primary["model"]}
+            if len(exclude) < len(self.scheduler.backends):
+                return self.scheduler.acquire(exclude=exclude), True
+        fallback = primary.get("fallback")
+        if fallback and fallback != primary["model"]:
+            return {"model": fallback, "system_prompt": FALLBACK_SYSTEM_PROMPT}, False
+        return None, False
+
+    def _call_hedged(
+        self,
+        prompt: Prompt,
+        primary: Dict[str, str],
+        scheduled: bool,
+        tripped: set,
+    ) -> Optional[Dict[str, Any]]:
+        """Race a duplicate against a straggler; the first valid JSON wins.
+
+        The loser is cancelled cooperatively: it skips its remaining retries
+        and fallback, a streamed loser also closes its stream at the next
+        chunk, and its result is discarded.
+        """
+        pool = self._hedge_executor()
+        self.hedges.on_request()
+
+        cancels: Dict[Any, threading.Event] = {}
+        hedged = set()
+
+        def submit(backend: Dict[str, str], slot: bool, text: Prompt, sent=None):
+            cancel = threading.Event()
+            future = pool.submit(self._attempt, text, backend, slot, cancel, sent)
+            cancels[future] = cancel
+            return future
+
+        sent = threading.Event()
+        pending = {submit(primary, scheduled, prompt, sent)}
+        # The hedge delay counts from when the primary is sent, not queued
+        sent.wait()
+        delay = self.scheduler.latency_percentile(primary["model"], HEDGE_PERCENTILE)
+        done, pending = wait(
+            pending, timeout=delay if delay is not None else HEDGE_DEFAULT_DELAY
+        )
+        if not done and self.hedges.try_hedge():
+            target, slot = self._hedge_target(primary, scheduled, tripped)
+            if target is not None:
+                # Only scheduled backends have a compacted prompt of their own
+                text = prompt if slot else self._prompt_for(prompt, primary)
+                future = submit(target, slot, text)
+                hedged.add(future)
+                pending.add(future)
+
+        error: Optional[BaseException] = None
+        while done or pending:
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error, result = e, None
+                if result is not None:
+                    for other in pending:
+                        cancels[other].set()
+                    if future in hedged:
+                        self.hedges.on_hedge_won()
+                    return result
+            if not pending:
+                break
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+
+        if error is not None:
+            raise error
+        return None
+
+    def _call_backend(
+        self,
+        prompt: str,
+        backend: Dict[str, str],
+        cancel: Optional[threading.Event] = None,
     ) -> Optional[Dict[str, Any]]:
         model = backend["model"]
         fallback_model = backend.get("fallback")
+        system_prompt = backend.get("system_prompt", SYSTEM_PROMPT)
         is_reasoning_model = "minimax" in model or "m2.1" in model
 
+        if not self.breakers.get(model).available() and not (
+            fallback_model and self.breakers.get(fallback_model).available()
+        ):
+            raise CircuitOpenError(f"Circuit open for {model}")
+
         for attempt in range(MAX_RETRIES):
+            if cancel is not None and cancel.is_set():
+                return None
             try:
-                max_tokens = 2048 if is_reasoning_model else 600
-
-                response = self.client.chat.completions.create(
-                    model=model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a JSON metadata generator. Output ONLY valid JSON, no thinking, no markdown, no explanation. Start with {",
-                        },
+                max_tokens = REASONING_TOKENS if is_reasoning_model else 600
+
+                return self._complete(
+                    model,
+                    [
+                        {"role": "system", "content": system_prompt},
                         {"role": "user", "content": prompt},
                     ],
-                    temperature=0.1,
-                    max_tokens=max_tokens,
-                    response_format={"type": "json_object"},
+                    max_tokens,
+                    is_reasoning_model,
+                    cancel,
                 )
 
-                content = response.choices[0].message.content
-                if content:
-                    return self._parse_json_response(content, is_reasoning_model)
-                return None
+            except CircuitOpenError:
+                # Tripped mid-retry: go straight to the fallback
+                break
 
             except RateLimitError:
-                delay = min(
-                    BASE_RETRY_DELAY * (2**attempt) + random.uniform(0, 1),
-                    MAX_RETRY_DELAY,
+                # The shared limiter has already paused every caller on this model
+                limiter = self.rate_limits.get(model)
+                print(
+                    f"[LLM] Rate limited on {model}, throttled to {limiter.rps:.2f} req/s"
                 )
-                print(f"[LLM] Rate limited on {model}, retrying in {delay:.1f}s...")
-                time.sleep(delay)
 
             except APITimeoutError:
                 print(f"[LLM] Timeout on {model}, attempt {attempt + 1}/{MAX_RETRIES}")
@@ -372,30 +1481,172 @@ Return ONLY valid JSON:
                 print(f"[LLM] Unexpected error on {model}: {e}")
                 break
 
+        if cancel is not None and cancel.is_set():
+            return None
+
         if fallback_model and model != fallback_model:
             print(f"[LLM] All retries failed, trying fallback {fallback_model}")
             try:
-                response = self.client.chat.completions.create(
-                    model=fallback_model,
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": "You are a JSON metadata generator. Output ONLY valid JSON.",
-                        },
+                return self._complete(
+                    fallback_model,
+                    [
+                        {"role": "system", "content": FALLBACK_SYSTEM_PROMPT},
                         {"role": "user", "content": prompt},
                     ],
-                    temperature=0.1,
-                    max_tokens=600,
-                    response_format={"type": "json_object"},
+                    600,
+                    False,
+                    cancel,
                 )
-                content = response.choices[0].message.content
-                if content:
-                    return self._parse_json_response(content, False)
             except Exception as e:
                 print(f"[LLM] Fallback {fallback_model} also failed: {e}")
 
         return None
 
+    def _call_batched(
+        self,
+        kind: str,
+        section: Prompt,
+        prompt: Prompt,
+        backend: Optional[Dict[str, str]] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Answer one server as part of a batch, falling back to its own call."""
+        cached = self._cached(prompt, backend)
+        if cached is not None:
+            return cached
+        group = (kind, backend["model"] if backend else None)
+        result = self.batcher.submit(group, (section, prompt, backend))
+        if result is None:
+            result = self._call_llm(prompt, backend)
+        return result
+
+    def _run_batch(
+        self, group: Tuple[str, Optional[str]], items: List[Tuple]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """One call per chunk that fits the backend; None marks elements
+        that have to be retried on their own."""
+        kind = group[0]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+        if len(items) < 2:
+            return results
+
+        backend = items[0][2]
+        scheduled = backend is None
+        if scheduled:
+            tripped = {
+                b["model"]
+                for b in self.scheduler.backends
+                if not self.breakers.get(b["model"]).available()
+            }
+            if len(tripped) == len(self.scheduler.backends):
+                return results
+            backend = self.scheduler.acquire(exclude=tripped)
+        elif not self.breakers.get(backend["model"]).available():
+            return results
+
+        started = time.monotonic()
+        ok = False
+        try:
+            sections = [self._prompt_for(s, backend) for s, _, _ in items]
+            for chunk in self._batch_chunks(kind, backend, sections):
+                try:
+                    parsed = self._request_batch(
+                        kind, [sections[i] for i in chunk], backend
+                    )
+                except Exception as e:
+                    print(
+                        f"[LLM] Batch of {len(chunk)} on {backend['model']} failed: {e}"
+                    )
+                    continue
+                ok = True
+                for i, result in zip(chunk, parsed):
+                    results[i] = result
+                    if result is not None and self.cache is not None:
+                        key = self._cache_key(
+                            backend["model"],
+                            SYSTEM_PROMPT,
+                            self._prompt_for(items[i][1], backend),
+                        )
+                        self.cache.put(key, result)
+        finally:
+            if scheduled:
+                self.scheduler.release(backend, time.monotonic() - started, ok)
+        return results
+
+    def _batch_chunks(
+        self, kind: str, backend: Dict[str, str], sections: List[str]
+    ) -> List[List[int]]:
+        """Split a batch so each request fits the backend's context window."""
+        model = backend["model"]
+        is_reasoning_model = "minimax" in model or "m2.1" in model
+        budget = backend.get("context", 32768) * BATCH_CONTEXT_SHARE
+        budget -= len(self._build_batch_prompt(kind, [])) // 4
+        if is_reasoning_model:
+            budget -= REASONING_TOKENS
+
+        chunks: List[List[int]] = []
+        current: List[int] = []
+        used = 0
+        for i, section in enumerate(sections):
+            cost = len(section) // 4 + BATCH_OUTPUT_TOKENS
+            if current and used + cost > budget:
+                chunks.append(current)
+                current, used = [], 0
+            current.append(i)
+            used += cost
+        if current:
+            chunks.append(current)
+        # A lone server is better served by the single-server prompt
+        return [chunk for chunk in chunks if len(chunk) > 1]
+
+    def _request_batch(
+        self, kind: str, sections: List[str], backend: Dict[str, str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        model = backend["model"]
+        is_reasoning_model = "minimax" in model or "m2.1" in model
+        max_tokens = len(sections) * BATCH_OUTPUT_TOKENS
+        if is_reasoning_model:
+            max_tokens += REASONING_TOKENS
+
+        response = self._create_completion(
+            model,
+            [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": self._build_batch_prompt(kind, sections)},
+            ],
+            max_tokens,
+        )
+        content = response.choices[0].message.content or ""
+        return self._parse_batch_response(content, len(sections), is_reasoning_model)
+
+    def _parse_batch_response(
+        self, content: str, count: int, is_reasoning_model: bool = False
+    ) -> List[Optional[Dict[str, Any]]]:
+        """Validate each keyed element with the single-server rules."""
+        results: List[Optional[Dict[str, Any]]] = [None] * count
+        content = content.strip()
+        if is_reasoning_model:
+            content = re.sub(r"^.*?(\{)", r"\1", content, flags=re.DOTALL)
+        start = content.find("{")
+        end = content.rfind("}") + 1
+        if start == -1 or end <= start:
+            return results
+        try:
+            data = json.loads(content[start:end])
+        except json.JSONDecodeError:
+            return results
+
+        elements = data.get("results") if isinstance(data, dict) else None
+        if not isinstance(elements, list):
+            return results
+        for element in elements:
+            if not isinstance(element, dict):
+                continue
+            key = str(element.get("id", "")).strip().lstrip("#")
+            if not key.isdigit() or not 1 <= int(key) <= count:
+                continue
+            results[int(key) - 1] = self._parse_json_response(json.dumps(element))
+        return results
+
     def _parse_json_response(
         self, content: str, is_reasoning_model: bool = False
     ) -> Optional[Dict[str, Any]]:
@@ -478,16 +1729,72 @@ Return ONLY valid JSON:
         repo_url: str,
         tools: List[Dict[str, Any]],
         backend: Optional[Dict[str, str]] = None,
+        original_desc: str = "",
     ) -> Optional[CleanedMetadata]:
-        prompt = self._build_prompt_from_tools(
-            server_id, original_name, namespace, repo_url, tools
-        )
+        if self.classifier is not None:
+            local = self.classifier.classify_tools(
+                original_name, repo_url, original_desc, tools
+            )
+            if local:
+                return CleanedMetadata(**local)
+
         b = backend or self.backend
-        result = self._call_llm(prompt, b)
+        if self.compact_prompts:
+            prompt, section = self._compact_prompts(
+                server_id, original_name, namespace, repo_url, tools, b
+            )
+        else:
+            prompt = self._build_prompt_from_tools(
+                server_id, original_name, namespace, repo_url, tools
+            )
+            section = None
+        if self.batcher is not None:
+            if section is None:
+                section = self._tools_section(original_name, namespace, repo_url, tools)
+            result = self._call_batched("tools", section, prompt, b)
+        else:
+            result = self._call_llm(prompt, b)
         if result:
             return CleanedMetadata(**result)
         return None
 
+    def _compact_prompts(
+        self,
+        server_id: str,
+        original_name: str,
+        namespace: str,
+        repo_url: str,
+        tools: List[Dict[str, Any]],
+        backend: Optional[Dict[str, str]],
+    ) -> Tuple[Prompt, Prompt]:
+        """Prompt and batch section fitted to each backend's budget.
+
+        A scheduled request may land on any backend, so it carries one
+        compacted prompt per backend; savings are recorded once per server.
+        """
+        targets = [backend] if backend else self.scheduler.backends
+        prompts: Dict[str, str] = {}
+        sections: Dict[str, str] = {}
+        for target in targets:
+            budget = self._tools_budget(
+                server_id, original_name, namespace, repo_url, target
+            )
+            prompts[target["model"]] = self._build_prompt_from_tools(
+                server_id,
+                original_name,
+                namespace,
+                repo_url,
+                tools,
+                budget,
+                record=not prompts,
+            )
+            sections[target["model"]] = self._tools_section(
+                original_name, namespace, repo_url, tools, budget, record=False
+            )
+        if backend:
+            return prompts[backend["model"]], sections[backend["model"]]
+        return prompts, sections
+
     def clean_server_from_repo(
         self,
         server_id: str,
@@ -497,11 +1804,22 @@ Return ONLY valid JSON:
         original_desc: str,
         backend: Optional[Dict[str, str]] = None,
     ) -> Optional[CleanedMetadata]:
+        if self.classifier is not None:
+            local = self.classifier.classify_repo(original_name, repo_url, original_desc)
+            if local:
+                return CleanedMetadata(**local)
+
         prompt = self._build_prompt_from_repo(
             server_id, original_name, namespace, repo_url, original_desc
         )
         b = backend or self.backend
-        result = self._call_llm(prompt, b)
+        if self.batcher is not None:
+            section = self._repo_section(
+                original_name, namespace, repo_url, original_desc
+            )
+            result = self._call_batched("repo", section, prompt, b)
+        else:
+            result = self._call_llm(prompt, b)
         if result:
             return CleanedMetadata(**result)
         return None
@@ -526,7 +1844,13 @@ Return ONLY valid JSON:
 
         if tools and len(tools) > 0:
             return self.clean_server_with_tools(
-                server_id, original_name, namespace, repo_url, tools, backend
+                server_id,
+                original_name,
+                namespace,
+                repo_url,
+                tools,
+                backend,
+                original_desc,
             )
         else:
             return self.clean_server_from_repo(
@@ -534,6 +1858,11 @@ Return ONLY valid JSON:
             )
 
 
+RATE_LIMITS = RateLimiterRegistry(LLMService.BACKENDS)
+LLM_BREAKERS = BreakerRegistry("llm", LLM_BREAKER_THRESHOLD, LLM_BREAKER_COOLDOWN)
+SCHEDULER = BackendScheduler(LLMService.BACKENDS)
+
+
 def clean_server_worker(args):
     server_data, backend = args
     service = LLMService(backend["model"])
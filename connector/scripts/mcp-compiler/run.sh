@@ -7,6 +7,19 @@
 #   ./run.sh --phase 2    # Only spawning
 #   ./run.sh --test       # Test mode (5 servers)
 #   ./run.sh --resume     # Resume from checkpoint
+#   ./run.sh --incremental  # Only new or changed registry entries
+#   ./run.sh --spawn-workers 48 --workers 6   # Stage concurrency
+#   ./run.sh --spawn-min 8 --spawn-max 64     # Adaptive spawn bounds
+#   ./run.sh --hedge 0.1  # Hedge slow LLM calls, at most 10% extra requests
+#   ./run.sh --stream     # Stop reading LLM output once the JSON closes
+#   ./run.sh --batch 16   # Up to 16 servers per LLM request
+#   ./run.sh --fast-path  # Tag obvious servers locally, LLM for the rest
+#   ./run.sh --compact-prompts  # Fit tool lists to per-backend token budgets
+#   ./run.sh --no-tool-cache --live-sessions 8  # Reuse live sessions for duplicates
+#   ./run.sh --spawn-batch      # Batch spawns when the Runtime offers /mcp/spawn/batch
+#
+# Offline benchmark against standin_runtime.py (no Runtime or inference API):
+#   python3 benchmark.py --servers 500 --latency 0.3 --failure-rate 0.1 --stream
 
 set -e
 
@@ -14,7 +27,7 @@ SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 cd "$SCRIPT_DIR"
 
 # Check Python dependencies
-if ! python3 -c "import requests, pydantic, tqdm" 2>/dev/null; then
+if ! python3 -c "import aiohttp, pydantic, tqdm" 2>/dev/null; then
     echo "Installing Python dependencies..."
     pip3 install -r requirements.txt -q
 fi
@@ -0,0 +1,542 @@
+"""
+Runtime API client for the MCP compiler.
+
+Owns one pooled keep-alive aiohttp session per compile run, so thousands of
+spawn calls share a small set of TCP+TLS connections to RUNTIME_URL instead
+of handshaking for each one. Connect and read timeouts are configured
+separately from the overall spawn budget, and a trace hook counts how many
+requests reused a pooled connection.
+
+With a batch size, concurrent spawns are coalesced into POST
+/mcp/spawn/batch when the Runtime advertises it in /mcp/capabilities;
+per-item results stream back as NDJSON or SSE and resolve each caller as
+they arrive. Otherwise every spawn is its own POST /mcp/spawn.
+"""
+
+import asyncio
+import json
+import os
+import re
+from dataclasses import dataclass, asdict
+from typing import Optional, Dict, Any, List, Set, Tuple
+from urllib.parse import quote
+
+import aiohttp
+from dotenv import load_dotenv
+
+load_dotenv()
+
+RUNTIME_URL = os.environ.get("RUNTIME_URL", "https://runtime.compose.market")
+MANOWAR_INTERNAL_SECRET = os.environ.get("MANOWAR_INTERNAL_SECRET", "")
+
+SPAWN_TIMEOUT = 90  # Match Runtime's 60s + buffer
+RUNTIME_CONNECT_TIMEOUT = float(os.environ.get("RUNTIME_CONNECT_TIMEOUT", "10"))
+RUNTIME_READ_TIMEOUT = float(os.environ.get("RUNTIME_READ_TIMEOUT", str(SPAWN_TIMEOUT)))
+RUNTIME_POOL_SIZE = int(os.environ.get("RUNTIME_POOL_SIZE", "0"))  # 0 = spawn workers
+RUNTIME_KEEPALIVE = float(os.environ.get("RUNTIME_KEEPALIVE", "30"))
+RELEASE_TIMEOUT = 10
+TOOLS_TIMEOUT = 15
+
+# Release answers from a Runtime that has no session teardown endpoint
+RELEASE_UNSUPPORTED_STATUSES = {405, 501}
+
+# Batch spawns: up to SPAWN_BATCH_SIZE items collected for SPAWN_BATCH_LINGER
+SPAWN_BATCH_SIZE = int(os.environ.get("SPAWN_BATCH_SIZE", "16"))
+SPAWN_BATCH_LINGER = float(os.environ.get("SPAWN_BATCH_LINGER", "0.02"))
+CAPABILITIES_TIMEOUT = 5
+BATCH_UNSUPPORTED_STATUSES = {404, 405, 501}
+
+# Spawn outcomes that mean the Runtime itself is struggling, not the server.
+# A spawn TIMEOUT is left out: dead packages time out on a healthy Runtime
+OVERLOAD_STATUSES = {429, 502, 503, 504}
+OVERLOAD_ERROR_CODES = {"CONNECT_TIMEOUT", "REQUEST_ERROR"}
+
+# Non-JSON 5xx bodies (proxy HTML, "Bad Gateway") say nothing about the server
+HTTP_5XX_ERROR_CODE = "HTTP_5XX"
+
+# Spawn outcomes that mean the Runtime or the path to it failed. A spawn
+# TIMEOUT is left out: dead packages time out on a perfectly healthy Runtime
+RUNTIME_FAILURE_ERROR_CODES = {"CONNECT_TIMEOUT", "REQUEST_ERROR", HTTP_5XX_ERROR_CODE}
+HTTP_ERROR_CODE = "HTTP_ERROR"
+ERROR_SNIPPET_CHARS = 120
+
+# aiohttp >= 3.10 raises a dedicated subclass for connect timeouts
+CONNECT_TIMEOUT_ERRORS = tuple(
+    e for e in [getattr(aiohttp, "ConnectionTimeoutError", None)] if e is not None
+)
+
+
+@dataclass
+class ConnectionStats:
+    requests: int = 0
+    connections_created: int = 0
+    connections_reused: int = 0
+    queued: int = 0
+    queue_wait_s: float = 0.0
+    sessions_released: int = 0
+    sessions_gone: int = 0
+    release_supported: bool = True
+    batches: int = 0
+    batched_spawns: int = 0
+
+    def reuse_ratio(self) -> float:
+        total = self.connections_created + self.connections_reused
+        return self.connections_reused / total if total else 0.0
+
+    def to_dict(self):
+        return asdict(self)
+
+    def summary(self) -> str:
+        return (
+            f"{self.requests} requests, {self.connections_created} new connections, "
+            f"{self.connections_reused} reused ({self.reuse_ratio():.0%}), "
+            f"{self.queued} waited {self.queue_wait_s:.1f}s for a pool slot"
+        )
+
+    def batch_summary(self) -> str:
+        avg = self.batched_spawns / self.batches if self.batches else 0.0
+        return (
+            f"{self.batched_spawns} spawns in {self.batches} batch requests "
+            f"(avg {avg:.1f} per batch)"
+        )
+
+    def sessions_summary(self) -> str:
+        if not self.release_supported:
+            return "release endpoint not supported by this Runtime"
+        return (
+            f"{self.sessions_released} released, "
+            f"{self.sessions_gone} already gone"
+        )
+
+
+def is_overloaded(result: Dict[str, Any]) -> bool:
+    """True when a spawn result signals Runtime overload (connect errors, 429/5xx)."""
+    if result.get("success"):
+        return False
+    return (
+        result.get("error_code") in OVERLOAD_ERROR_CODES
+        or result.get("status") in OVERLOAD_STATUSES
+    )
+
+
+def is_runtime_failure(result: Dict[str, Any]) -> bool:
+    """True when a spawn failed in the Runtime or transport, not the server."""
+    if result.get("success"):
+        return False
+    return (
+        result.get("error_code") in RUNTIME_FAILURE_ERROR_CODES
+        or result.get("status") in OVERLOAD_STATUSES
+    )
+
+
+class RuntimeClient:
+    """Async context manager wrapping a pooled session to the Runtime."""
+
+    def __init__(
+        self,
+        pool_size: int,
+        base_url: str = RUNTIME_URL,
+        connect_timeout: float = RUNTIME_CONNECT_TIMEOUT,
+        read_timeout: float = RUNTIME_READ_TIMEOUT,
+        spawn_timeout: float = SPAWN_TIMEOUT,
+        keepalive: float = RUNTIME_KEEPALIVE,
+        batch_size: int = 0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.pool_size = max(1, RUNTIME_POOL_SIZE or pool_size)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.spawn_timeout = spawn_timeout
+        self.keepalive = keepalive
+        self.stats = ConnectionStats()
+        self._session: Optional[aiohttp.ClientSession] = None
+        # Batching stays off until the Runtime advertises the endpoint
+        self.batch_size = batch_size
+        self.batch_supported: Optional[bool] = None if batch_size > 1 else False
+        self._capabilities_lock = asyncio.Lock()
+        self._pending: List[Tuple[Dict[str, Any], asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._batches: Set[asyncio.Future] = set()
+
+    async def __aenter__(self) -> "RuntimeClient":
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_connection_create_end.append(self._on_connection_create)
+        trace.on_connection_reuseconn.append(self._on_connection_reuse)
+        trace.on_connection_queued_start.append(self._on_queued_start)
+        trace.on_connection_queued_end.append(self._on_queued_end)
+
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_size,
+            limit_per_host=self.pool_size,
+            keepalive_timeout=self.keepalive,
+        )
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            trace_configs=[trace],
+            timeout=aiohttp.ClientTimeout(
+                total=self.spawn_timeout,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout,
+            ),
+        )
+        return self
+
+    async def __aexit__(self, *exc):
+        if self._pending:
+            self._flush()
+        # Batches still streaming start releases for late results; wait for those too
+        while self._batches:
+            await asyncio.gather(*self._batches, return_exceptions=True)
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def _on_request_start(self, session, ctx, params):
+        self.stats.requests += 1
+
+    async def _on_connection_create(self, session, ctx, params):
+        self.stats.connections_created += 1
+
+    async def _on_connection_reuse(self, session, ctx, params):
+        self.stats.connections_reused += 1
+
+    async def _on_queued_start(self, session, ctx, params):
+        ctx.queued_at = asyncio.get_running_loop().time()
+
+    async def _on_queued_end(self, session, ctx, params):
+        self.stats.queued += 1
+        self.stats.queue_wait_s += asyncio.get_running_loop().time() - ctx.queued_at
+
+    def _headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if MANOWAR_INTERNAL_SECRET:
+            headers["x-manowar-internal"] = MANOWAR_INTERNAL_SECRET
+        return headers
+
+    async def spawn(
+        self,
+        server_id: str,
+        config: Optional[Dict] = None,
+        timeout: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Spawn server via Runtime API with optional config and timeout override."""
+        timeout = timeout or self.spawn_timeout
+        if self.batch_supported is not False and await self._batch_available():
+            return await self._spawn_batched(server_id, config, timeout)
+        return await self._spawn_one(server_id, config, timeout)
+
+    @staticmethod
+    def _spawn_result(
+        status: int, data: Any, text: str, config: Optional[Dict]
+    ) -> Dict[str, Any]:
+        """Spawn result from a Runtime answer (a whole response or one batch item)."""
+        if status == 200 and isinstance(data, dict) and "error" not in data:
+            return {
+                "success": True,
+                "sessionId": data.get("sessionId"),
+                "tools": data.get("tools", []),
+                "transport": config.get("transport")
+                if config
+                else data.get("transport", "unknown"),
+            }
+        if not isinstance(data, dict):
+            # Proxies answer 502/503 with HTML; keep the status and a short,
+            # tag-free snippet so nothing downstream scrapes the markup
+            snippet = re.sub(r"<[^>]*>", " ", text or "")
+            snippet = " ".join(snippet.split())[:ERROR_SNIPPET_CHARS]
+            return {
+                "success": False,
+                "error": f"HTTP {status}: {snippet}" if snippet else f"HTTP {status}",
+                "error_code": HTTP_5XX_ERROR_CODE if status >= 500 else HTTP_ERROR_CODE,
+                "status": status,
+                "tools": [],
+            }
+        if isinstance(data.get("error"), dict):
+            error_code = data["error"].get("code", "")
+            error_msg = data["error"].get("message", text)
+        else:
+            error_code = ""
+            error_msg = str(data.get("error", text))
+        return {
+            "success": False,
+            "error": error_msg,
+            "error_code": error_code,
+            "status": status,
+            "tools": [],
+        }
+
+    async def _spawn_one(
+        self, server_id: str, config: Optional[Dict], timeout: float
+    ) -> Dict[str, Any]:
+        try:
+            payload: Dict[str, Any] = {"serverId": server_id}
+            if config:
+                payload["config"] = config
+
+            async with self._session.post(
+                f"{self.base_url}/mcp/spawn",
+                json=payload,
+                headers=self._headers(),
+                timeout=aiohttp.ClientTimeout(
+                    total=timeout,
+                    sock_connect=self.connect_timeout,
+                    sock_read=min(self.read_timeout, timeout),
+                ),
+            ) as response:
+                text = await response.text()
+                try:
+                    data = json.loads(text)
+                except ValueError:
+                    data = None
+                return self._spawn_result(response.status, data, text, config)
+
+        except CONNECT_TIMEOUT_ERRORS:
+            return {
+                "success": False,
+                "error": f"Runtime connect timeout ({self.connect_timeout:g}s)",
+                "error_code": "CONNECT_TIMEOUT",
+                "tools": [],
+            }
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Spawn timeout ({timeout:g}s)",
+                "error_code": "TIMEOUT",
+                "tools": [],
+            }
+        except aiohttp.ClientError as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "error_code": "REQUEST_ERROR",
+                "tools": [],
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "error_code": "UNKNOWN",
+                "tools": [],
+            }
+
+    async def _batch_available(self) -> bool:
+        """Ask /mcp/capabilities once whether ``spawnBatch`` is supported."""
+        async with self._capabilities_lock:
+            if self.batch_supported is not None:
+                return self.batch_supported
+            supported = False
+            try:
+                async with self._session.get(
+                    f"{self.base_url}/mcp/capabilities",
+                    headers=self._headers(),
+                    timeout=aiohttp.ClientTimeout(total=CAPABILITIES_TIMEOUT),
+                ) as response:
+                    data = await response.json(content_type=None)
+                    if response.status == 200 and isinstance(data, dict):
+                        batch = data.get("spawnBatch")
+                        if isinstance(batch, dict) and batch.get("maxItems"):
+                            limit = int(batch["maxItems"])
+                            self.batch_size = min(self.batch_size, limit)
+                        supported = bool(batch) and self.batch_size > 1
+            except Exception:
+                pass
+            # Set only once known: spawns arriving meanwhile wait on the lock
+            self.batch_supported = supported
+            if supported:
+                print(f"[Runtime] Batch spawn enabled, {self.batch_size} per request")
+            else:
+                print("[Runtime] Batch spawn not advertised, using single spawns")
+            return supported
+
+    async def _spawn_batched(
+        self, server_id: str, config: Optional[Dict], timeout: float
+    ) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        item: Dict[str, Any] = {"serverId": server_id, "timeout": timeout}
+        if config:
+            item["config"] = config
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(SPAWN_BATCH_LINGER, self._flush)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            return {
+                "success": False,
+                "error": f"Spawn timeout ({timeout:g}s)",
+                "error_code": "TIMEOUT",
+                "tools": [],
+            }
+        finally:
+            # A late result then releases its own session
+            future.cancel()
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch = self._pending[: self.batch_size]
+            self._pending = self._pending[self.batch_size :]
+            task = asyncio.ensure_future(self._run_batch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    def _resolve(self, future: asyncio.Future, result: Dict[str, Any]):
+        if not future.done():
+            future.set_result(result)
+        elif result.get("sessionId"):
+            # Nobody is waiting any more (timed out or cancelled)
+            task = asyncio.ensure_future(self.release(result["sessionId"]))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        pending = {str(i): entry for i, entry in enumerate(batch)}
+        # Callers give up at their own timeout; the stream stays open for the
+        # full budget so results arriving after that are still released
+        timeout = max([self.spawn_timeout] + [item["timeout"] for item, _ in batch])
+        failure: Optional[Dict[str, Any]] = None
+        self.stats.batches += 1
+        self.stats.batched_spawns += len(batch)
+        try:
+            async with self._session.post(
+                f"{self.base_url}/mcp/spawn/batch",
+                json={"items": [dict(item, id=i) for i, (item, _) in pending.items()]},
+                headers=dict(
+                    self._headers(), Accept="application/x-ndjson, text/event-stream"
+                ),
+                timeout=aiohttp.ClientTimeout(
+                    total=timeout,
+                    sock_connect=self.connect_timeout,
+                    sock_read=timeout,
+                ),
+            ) as response:
+                if response.status in BATCH_UNSUPPORTED_STATUSES:
+                    print(
+                        f"[Runtime] Batch spawn rejected (HTTP {response.status}), "
+                        f"falling back to single spawns"
+                    )
+                    self.batch_supported = False
+                    await self._spawn_singly(pending)
+                    return
+                if response.status != 200:
+                    text = await response.text()
+                    try:
+                        data = json.loads(text)
+                    except ValueError:
+                        data = None
+                    failure = self._spawn_result(response.status, data, text, None)
+                    return
+
+                async for raw in response.content:
+                    line = raw.decode("utf-8", "replace").strip()
+                    # NDJSON lines, or SSE "data:" lines (comments/events skipped)
+                    if line.startswith("data:"):
+                        line = line[5:].strip()
+                    elif not line.startswith("{"):
+                        continue
+                    if line == "[DONE]":
+                        break
+                    try:
+                        data = json.loads(line)
+                    except ValueError:
+                        continue
+                    entry = pending.pop(str(data.get("id")), None)
+                    if entry is None:
+                        continue
+                    item, future = entry
+                    status = int(data.get("status", 500 if "error" in data else 200))
+                    result = self._spawn_result(status, data, line, item.get("config"))
+                    self._resolve(future, result)
+        except CONNECT_TIMEOUT_ERRORS:
+            failure = {
+                "success": False,
+                "error": f"Runtime connect timeout ({self.connect_timeout:g}s)",
+                "error_code": "CONNECT_TIMEOUT",
+            }
+        except asyncio.TimeoutError:
+            failure = {
+                "success": False,
+                "error": f"Spawn timeout ({timeout:g}s)",
+                "error_code": "TIMEOUT",
+            }
+        except aiohttp.ClientError as e:
+            failure = {"success": False, "error": str(e), "error_code": "REQUEST_ERROR"}
+        finally:
+            failure = failure or {
+                "success": False,
+                "error": "No result in batch response",
+                "error_code": "REQUEST_ERROR",
+            }
+            for _, future in pending.values():
+                self._resolve(future, dict(failure, tools=[]))
+
+    async def _spawn_singly(self, pending: Dict[str, Tuple[Dict, asyncio.Future]]):
+        async def one(key: str):
+            item, future = pending[key]
+            result = await self._spawn_one(
+                item["serverId"], item.get("config"), item["timeout"]
+            )
+            pending.pop(key, None)
+            self._resolve(future, result)
+
+        await asyncio.gather(*(one(key) for key in list(pending)))
+
+    async def release(self, session_id: str) -> bool:
+        """Best-effort teardown of a Runtime session we no longer need.
+
+        A 404 means the session is already gone. A Runtime without the
+        endpoint (405/501) is not asked again for the rest of the run.
+        """
+        if not session_id or not self.stats.release_supported:
+            return False
+        try:
+            async with self._session.delete(
+                f"{self.base_url}/mcp/sessions/{quote(session_id, safe='')}",
+                headers=self._headers(),
+                timeout=aiohttp.ClientTimeout(total=RELEASE_TIMEOUT),
+            ) as response:
+                if response.status in RELEASE_UNSUPPORTED_STATUSES:
+                    if self.stats.release_supported:
+                        print(
+                            f"[Runtime] Session release unsupported "
+                            f"(HTTP {response.status}), leaving sessions to expire"
+                        )
+                    self.stats.release_supported = False
+                    return False
+                if response.status == 404:
+                    self.stats.sessions_gone += 1
+                    return False
+                if response.status < 300:
+                    self.stats.sessions_released += 1
+                    return True
+                return False
+        except Exception:
+            return False
+
+    async def list_tools(self, session_id: str) -> Dict[str, Any]:
+        """``tools/list`` on a live session, in the same shape as spawn()."""
+        try:
+            async with self._session.get(
+                f"{self.base_url}/mcp/sessions/{quote(session_id, safe='')}/tools",
+                headers=self._headers(),
+                timeout=aiohttp.ClientTimeout(total=TOOLS_TIMEOUT),
+            ) as response:
+                if response.status != 200:
+                    return {
+                        "success": False,
+                        "error": f"HTTP {response.status}",
+                        "status": response.status,
+                        "tools": [],
+                    }
+                data = await response.json(content_type=None)
+                tools = data.get("tools", []) if isinstance(data, dict) else data
+                return {"success": True, "sessionId": session_id, "tools": tools}
+        except Exception as e:
+            return {"success": False, "error": str(e), "tools": []}
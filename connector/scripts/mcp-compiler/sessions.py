@@ -0,0 +1,53 @@
+"""
+Live Runtime sessions kept for reuse.
+
+Once its tools are captured a spawned session is normally released right
+away, so it stops holding a slot on the Runtime. With a non-zero capacity
+the most recently used sessions are parked per spawn config instead, and a
+later duplicate asks the parked session for ``tools/list`` rather than
+spawning the same server again. Whatever is evicted, or still parked when
+the run ends, is released.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+
+
+class LiveSessions:
+    def __init__(self, capacity: int):
+        self.capacity = max(0, capacity)
+        self._sessions: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.parked = 0
+        self.reused = 0
+        self.evicted = 0
+
+    def checkout(self, key: Hashable) -> Optional[str]:
+        """Take the parked session for ``key``; park it again after use."""
+        return self._sessions.pop(key, None)
+
+    def park(self, key: Hashable, session_id: str) -> List[str]:
+        """Keep ``session_id`` for ``key``; returns sessions to release."""
+        if self.capacity == 0:
+            return [session_id]
+        released = []
+        previous = self._sessions.pop(key, None)
+        if previous and previous != session_id:
+            released.append(previous)
+        self._sessions[key] = session_id
+        self.parked += 1
+        while len(self._sessions) > self.capacity:
+            _, evicted = self._sessions.popitem(last=False)
+            released.append(evicted)
+            self.evicted += 1
+        return released
+
+    def drain(self) -> List[str]:
+        sessions = list(self._sessions.values())
+        self._sessions.clear()
+        return sessions
+
+    def summary(self) -> str:
+        return (
+            f"{len(self._sessions)}/{self.capacity} parked, {self.reused} reused "
+            f"via tools/list, {self.evicted} evicted"
+        )
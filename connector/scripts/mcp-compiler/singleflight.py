@@ -0,0 +1,98 @@
+"""
+Request coalescing ("singleflight") for the MCP compiler.
+
+Registry sources overlap heavily, so duplicate entries often resolve to the
+same spawn config or build byte-identical LLM prompts. Concurrent callers
+with the same key wait on the one request already in flight instead of
+issuing their own, and every follower gets a private copy of the result.
+"""
+
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Coalesces blocking calls made from worker threads."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Run ``fn`` once per in-flight ``key``; returns ``(result, shared)``."""
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return copy.deepcopy(call.result), True
+
+        try:
+            call.result = fn()
+            return call.result, False
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def summary(self) -> str:
+        return f"{self.shared}/{self.calls} calls shared an in-flight request"
+
+
+class AsyncSingleFlight:
+    """Coalesces coroutines on one event loop.
+
+    The shared request runs as its own task, so a caller that is cancelled
+    (e.g. a transport that lost a race) does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(
+        self, key: Hashable, factory: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Await one shared ``factory()`` per key; returns ``(result, shared)``."""
+        self.calls += 1
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+            task.add_done_callback(lambda t: self._finish(key, t))
+        else:
+            self.shared += 1
+
+        result = await asyncio.shield(task)
+        return (result, False) if leader else (copy.deepcopy(result), True)
+
+    def _finish(self, key: Hashable, task: asyncio.Task):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+
+    def summary(self) -> str:
+        return f"{self.shared}/{self.calls} calls shared an in-flight request"
@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Runtime's MCP endpoints and the ASI inference API.
+
+Implements just enough of both for the compiler to run offline:
+
+    GET    /mcp/capabilities            advertises spawnBatch (unless --no-batch)
+    POST   /mcp/spawn                   one server
+    POST   /mcp/spawn/batch             {"items": [{id, serverId, config}]},
+                                        results streamed as NDJSON, or SSE when
+                                        only text/event-stream is accepted
+    GET    /mcp/sessions/:id/tools      tools/list on a live session
+    DELETE /mcp/sessions/:id            teardown
+    POST   /v1/chat/completions         OpenAI-compatible, streaming included
+    GET    /stats                       request counters
+
+Latencies are drawn from a fixed, uniform, exponential or lognormal
+distribution with the given mean. Whether a server needs credentials and how
+many tools it has are fixed per server id, so retries see the same server;
+spawn failures and 429s are drawn per request. Completions answer every
+server in the prompt (batched prompts included) with metadata that passes
+the compiler's validation.
+
+Usage:
+    python standin_runtime.py [--port 8787] [--latency 0.5] [--no-batch]
+    RUNTIME_URL=http://127.0.0.1:8787 ASI_BASE_URL=http://127.0.0.1:8787/v1 \\
+        python compiler.py --spawn-batch
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from aiohttp import web
+
+DEFAULT_PORT = 8787
+BATCH_MAX_ITEMS = 64
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+LOGNORMAL_SIGMA = 1.0
+STREAM_CHUNK_CHARS = 16
+
+TOOL_ACTIONS = ["list", "get", "create", "update", "delete", "search", "query"]
+# Pairs of VALID_TAGS the compiler accepts
+TAG_PAIRS = [
+    ["database", "postgresql"],
+    ["git", "github"],
+    ["messaging", "slack"],
+    ["search", "web-scraping"],
+    ["storage", "filesystem"],
+    ["weather", "geolocation"],
+]
+
+
+def sample_latency(rng: random.Random, distribution: str, mean: float) -> float:
+    """One latency in seconds with the given mean."""
+    if mean <= 0:
+        return 0.0
+    if distribution == "fixed":
+        return mean
+    if distribution == "uniform":
+        return rng.uniform(0, 2 * mean)
+    if distribution == "exponential":
+        return rng.expovariate(1 / mean)
+    # mu chosen so the mean, not the median, is ``mean``
+    mu = math.log(mean) - LOGNORMAL_SIGMA**2 / 2
+    return rng.lognormvariate(mu, LOGNORMAL_SIGMA)
+
+
+def server_share(server_id: str, salt: str) -> float:
+    """Stable value in [0, 1) per server, independent of the request order."""
+    return zlib.crc32(f"{salt}:{server_id}".encode()) % 10000 / 10000
+
+
+@dataclass
+class StandinConfig:
+    latency: float = 0.5
+    latency_dist: str = "uniform"
+    failure_rate: float = 0.0
+    credential_rate: float = 0.0
+    tools: int = 8
+    desc_chars: int = 80
+    batch: bool = True
+    llm_latency: float = 1.0
+    llm_latency_dist: str = "lognormal"
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+
+class StandinRuntime:
+    def __init__(self, config: Optional[StandinConfig] = None):
+        self.config = config or StandinConfig()
+        self.random = random.Random(self.config.seed)
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.stats = {
+            "spawns": 0,
+            "spawn_failures": 0,
+            "credential_errors": 0,
+            "batches": 0,
+            "tools_calls": 0,
+            "released": 0,
+            "completions": 0,
+            "rate_limited": 0,
+        }
+
+    def app(self) -> web.Application:
+        app = web.Application(client_max_size=16 * 1024**2)
+        app.router.add_get("/mcp/capabilities", self.capabilities)
+        app.router.add_post("/mcp/spawn", self.spawn)
+        if self.config.batch:
+            app.router.add_post("/mcp/spawn/batch", self.spawn_batch)
+        app.router.add_get("/mcp/sessions/{session_id}/tools", self.session_tools)
+        app.router.add_delete("/mcp/sessions/{session_id}", self.release)
+        app.router.add_post("/v1/chat/completions", self.chat_completions)
+        app.router.add_get("/stats", self.get_stats)
+        return app
+
+    def _tools(self, server_id: str) -> List[Dict[str, str]]:
+        config = self.config
+        count = 1 + int(server_share(server_id, "tools") * (2 * config.tools - 1))
+        name = re.sub(r"[^a-z0-9]+", "_", server_id.split("/")[-1].lower()) or "server"
+        filler = f" Works on {name} resources." * (config.desc_chars // 20 + 1)
+        return [
+            {
+                "name": f"{name}_{TOOL_ACTIONS[i % len(TOOL_ACTIONS)]}_{i}",
+                "description": f"Tool {i} of {server_id}.{filler}"[: config.desc_chars],
+            }
+            for i in range(count)
+        ]
+
+    async def _spawn(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """Status and body for one spawn request."""
+        config = self.config
+        self.stats["spawns"] += 1
+        server_id = item.get("serverId", "")
+        spawn_config = item.get("config") or {}
+        await asyncio.sleep(
+            sample_latency(self.random, config.latency_dist, config.latency)
+        )
+
+        if server_share(server_id, "credentials") < config.credential_rate:
+            self.stats["credential_errors"] += 1
+            return {
+                "status": 400,
+                "error": {
+                    "code": "CREDENTIALS_REQUIRED",
+                    "message": f'Server "{server_id}" requires credentials: API_KEY',
+                },
+            }
+        if self.random.random() < config.failure_rate:
+            self.stats["spawn_failures"] += 1
+            return {
+                "status": 500,
+                "error": {"code": "SPAWN_FAILED", "message": "Process exited early"},
+            }
+
+        session_id = str(uuid.uuid4())
+        tools = self._tools(server_id)
+        self.sessions[session_id] = {"serverId": server_id, "tools": tools}
+        return {
+            "status": 200,
+            "sessionId": session_id,
+            "tools": tools,
+            "transport": spawn_config.get("transport", "unknown"),
+        }
+
+    async def capabilities(self, request: web.Request) -> web.Response:
+        body: Dict[str, Any] = {"spawn": True, "sessions": True}
+        if self.config.batch:
+            body["spawnBatch"] = {
+                "maxItems": BATCH_MAX_ITEMS,
+                "formats": ["ndjson", "sse"],
+            }
+        return web.json_response(body)
+
+    async def spawn(self, request: web.Request) -> web.Response:
+        result = await self._spawn(await request.json())
+        status = result.pop("status")
+        return web.json_response(result, status=status)
+
+    async def spawn_batch(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        items = body.get("items", [])[:BATCH_MAX_ITEMS]
+        self.stats["batches"] += 1
+        accept = request.headers.get("Accept", "")
+        sse = "text/event-stream" in accept and "application/x-ndjson" not in accept
+
+        response = web.StreamResponse(
+            headers={
+                "Content-Type": "text/event-stream" if sse else "application/x-ndjson"
+            }
+        )
+        await response.prepare(request)
+
+        async def run(item: Dict[str, Any]) -> Dict[str, Any]:
+            return dict(await self._spawn(item), id=item.get("id"))
+
+        # Each result goes out as soon as its spawn finishes
+        for next_done in asyncio.as_completed([run(item) for item in items]):
+            line = json.dumps(await next_done)
+            await response.write(
+                f"data: {line}\n\n".encode() if sse else f"{line}\n".encode()
+            )
+        if sse:
+            await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def session_tools(self, request: web.Request) -> web.Response:
+        self.stats["tools_calls"] += 1
+        session = self.sessions.get(request.match_info["session_id"])
+        if session is None:
+            return web.json_response({"error": "Session not found"}, status=404)
+        return web.json_response({"tools": session["tools"]})
+
+    async def release(self, request: web.Request) -> web.Response:
+        if self.sessions.pop(request.match_info["session_id"], None) is None:
+            return web.json_response({"error": "Session not found"}, status=404)
+        self.stats["released"] += 1
+        return web.json_response({"success": True})
+
+    def _metadata(self, original_name: str) -> Dict[str, Any]:
+        words = re.findall(r"[A-Za-z0-9]+", original_name)
+        name = " ".join(w.capitalize() for w in words if w.lower() != "mcp")
+        tags = TAG_PAIRS[zlib.crc32(original_name.encode()) % len(TAG_PAIRS)]
+        return {
+            "name": f"{name or 'Standin'} Tools",
+            "description": f"Provides {tags[0]} tools. Generated by the stand-in.",
+            "tags": tags,
+        }
+
+    def _completion_text(self, prompt: str) -> str:
+        names = re.findall(r'Original Name: "(.*?)"', prompt)
+        if re.search(r"^SERVER 1:", prompt, re.MULTILINE):
+            return json.dumps(
+                {
+                    "results": [
+                        dict(self._metadata(name), id=i)
+                        for i, name in enumerate(names, 1)
+                    ]
+                }
+            )
+        return json.dumps(self._metadata(names[0] if names else ""))
+
+    async def chat_completions(self, request: web.Request) -> web.StreamResponse:
+        config = self.config
+        body = await request.json()
+        self.stats["completions"] += 1
+        if self.random.random() < config.rate_limit_rate:
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit"}},
+                status=429,
+                headers={"Retry-After": f"{config.retry_after:g}"},
+            )
+        await asyncio.sleep(
+            sample_latency(self.random, config.llm_latency_dist, config.llm_latency)
+        )
+
+        prompt = "\n".join(m.get("content", "") for m in body.get("messages", []))
+        text = self._completion_text(prompt)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        model = body.get("model", "standin")
+        created = int(time.time())
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": created,
+                    "model": model,
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": text},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": len(prompt) // 4,
+                        "completion_tokens": len(text) // 4,
+                        "total_tokens": (len(prompt) + len(text)) // 4,
+                    },
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        pieces = [
+            text[i : i + STREAM_CHUNK_CHARS]
+            for i in range(0, len(text), STREAM_CHUNK_CHARS)
+        ]
+        for i, piece in enumerate(pieces + [None]):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [
+                    {
+                        "index": 0,
+                        "delta": {"content": piece} if piece is not None else {},
+                        "finish_reason": None if piece is not None else "stop",
+                    }
+                ],
+            }
+            try:
+                await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            except ConnectionResetError:
+                # The compiler hangs up once the JSON object closes
+                return response
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    async def get_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(dict(self.stats, live_sessions=len(self.sessions)))
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Stand-in behaviour flags, shared with benchmark.py."""
+    defaults = StandinConfig()
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=defaults.latency,
+        help="Mean spawn latency in seconds",
+    )
+    parser.add_argument(
+        "--latency-dist", choices=LATENCY_DISTRIBUTIONS, default=defaults.latency_dist
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=defaults.failure_rate,
+        help="Share of spawn requests that fail with SPAWN_FAILED",
+    )
+    parser.add_argument(
+        "--credential-rate",
+        type=float,
+        default=defaults.credential_rate,
+        help="Share of servers that answer CREDENTIALS_REQUIRED",
+    )
+    parser.add_argument(
+        "--tools", type=int, default=defaults.tools, help="Mean tools per server"
+    )
+    parser.add_argument(
+        "--desc-chars",
+        type=int,
+        default=defaults.desc_chars,
+        help="Characters per tool description",
+    )
+    parser.add_argument(
+        "--no-batch", action="store_true", help="Do not offer /mcp/spawn/batch"
+    )
+    parser.add_argument(
+        "--llm-latency",
+        type=float,
+        default=defaults.llm_latency,
+        help="Mean chat completion latency in seconds",
+    )
+    parser.add_argument(
+        "--llm-latency-dist",
+        choices=LATENCY_DISTRIBUTIONS,
+        default=defaults.llm_latency_dist,
+    )
+    parser.add_argument(
+        "--rate-limit-rate",
+        type=float,
+        default=defaults.rate_limit_rate,
+        help="Share of chat completions answered with 429",
+    )
+    parser.add_argument(
+        "--retry-after",
+        type=float,
+        default=defaults.retry_after,
+        help="Retry-After seconds sent with each 429",
+    )
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+
+
+def config_from_args(args: argparse.Namespace) -> StandinConfig:
+    return StandinConfig(
+        latency=args.latency,
+        latency_dist=args.latency_dist,
+        failure_rate=args.failure_rate,
+        credential_rate=args.credential_rate,
+        tools=args.tools,
+        desc_chars=args.desc_chars,
+        batch=not args.no_batch,
+        llm_latency=args.llm_latency,
+        llm_latency_dist=args.llm_latency_dist,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+
+def serve(config: StandinConfig, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    runtime = StandinRuntime(config)
+    print(f"[Standin] Runtime and inference on http://{host}:{port}")
+    web.run_app(runtime.app(), host=host, port=port, print=None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in Runtime")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    add_arguments(parser)
+    args = parser.parse_args()
+    serve(config_from_args(args), args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Batch spawns against the local stand-in Runtime.
+
+Each test serves StandinRuntime.app() on an ephemeral port, spawns through
+RuntimeClient (and the Spawner where sessions are released), and checks the
+stand-in's /stats afterwards: every session that was spawned has been
+released and none is left live.
+
+Run from this directory:
+    python -m pytest -q test_runtime_batch.py
+"""
+
+import asyncio
+import contextlib
+from typing import Any, Dict
+
+import aiohttp
+from aiohttp import web
+
+from compiler import Spawner
+from runtime_client import RuntimeClient
+from standin_runtime import StandinConfig, StandinRuntime
+
+SERVERS = 20
+BATCH_SIZE = 8
+
+
+def spawn_config(i: int) -> Dict[str, Any]:
+    # Distinct packages, so no two spawns share a flight
+    return {"transport": "npx", "package": f"@standin/server-{i}"}
+
+
+@contextlib.asynccontextmanager
+async def serve(runtime: StandinRuntime, sse_only: bool = False):
+    """Yield the base URL of ``runtime`` served on a free local port."""
+    app = runtime.app()
+    if sse_only:
+
+        @web.middleware
+        async def accept_sse(request: web.Request, handler):
+            # The client accepts both formats and the stand-in prefers NDJSON
+            headers = dict(request.headers, Accept="text/event-stream")
+            return await handler(request.clone(headers=headers))
+
+        app.middlewares.append(accept_sse)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+
+async def standin_stats(url: str) -> Dict[str, int]:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{url}/stats") as response:
+            return await response.json()
+
+
+async def spawn_all(url: str, batch_size: int = BATCH_SIZE):
+    """Spawn SERVERS servers through a Spawner; return results and the client."""
+    async with RuntimeClient(
+        pool_size=4, base_url=url, batch_size=batch_size
+    ) as runtime:
+        spawner = Spawner(runtime)
+        results = await asyncio.gather(
+            *(spawner.spawn(f"server-{i}", spawn_config(i)) for i in range(SERVERS))
+        )
+        await spawner.close()
+    return results, runtime
+
+
+def fast_standin(**overrides) -> StandinRuntime:
+    settings = dict(latency=0.01, latency_dist="fixed", seed=0)
+    return StandinRuntime(StandinConfig(**dict(settings, **overrides)))
+
+
+def assert_all_released(stats: Dict[str, int], spawns: int):
+    assert stats["spawns"] == spawns
+    assert stats["released"] == spawns
+    assert stats["live_sessions"] == 0
+
+
+def test_batch_ndjson():
+    async def run():
+        async with serve(fast_standin()) as url:
+            results, runtime = await spawn_all(url)
+            return results, runtime, await standin_stats(url)
+
+    results, runtime, stats = asyncio.run(run())
+    assert all(r["success"] and r["tools"] for r in results)
+    assert all(r["transport"] == "npx" for r in results)
+    assert runtime.batch_supported is True
+    assert runtime.stats.batched_spawns == SERVERS
+    assert stats["batches"] == runtime.stats.batches >= SERVERS // BATCH_SIZE
+    assert_all_released(stats, SERVERS)
+
+
+def test_batch_sse():
+    async def run():
+        async with serve(fast_standin(), sse_only=True) as url:
+            results, runtime = await spawn_all(url)
+            return results, runtime, await standin_stats(url)
+
+    results, runtime, stats = asyncio.run(run())
+    assert all(r["success"] and r["tools"] for r in results)
+    assert runtime.stats.batched_spawns == SERVERS
+    assert stats["batches"] >= SERVERS // BATCH_SIZE
+    assert_all_released(stats, SERVERS)
+
+
+def test_batch_errors_resolve_their_items():
+    async def run():
+        async with serve(fast_standin(credential_rate=1.0)) as url:
+            results, _ = await spawn_all(url)
+            return results, await standin_stats(url)
+
+    results, stats = asyncio.run(run())
+    assert all(not r["success"] for r in results)
+    assert all(r["error_code"] == "CREDENTIALS_REQUIRED" for r in results)
+    assert "API_KEY" in results[0]["error"]
+    assert stats["credential_errors"] == SERVERS
+    assert stats["released"] == 0
+    assert stats["live_sessions"] == 0
+
+
+def test_not_advertised_uses_single_spawns():
+    async def run():
+        async with serve(fast_standin(batch=False)) as url:
+            results, runtime = await spawn_all(url)
+            return results, runtime, await standin_stats(url)
+
+    results, runtime, stats = asyncio.run(run())
+    assert all(r["success"] and r["tools"] for r in results)
+    assert runtime.batch_supported is False
+    assert runtime.stats.batches == 0
+    assert stats["batches"] == 0
+    assert_all_released(stats, SERVERS)
+
+
+class MissingBatchRoute(StandinRuntime):
+    """Advertises spawnBatch in /mcp/capabilities but 404s the endpoint."""
+
+    async def spawn_batch(self, request: web.Request) -> web.Response:
+        return web.json_response({"error": "Not found"}, status=404)
+
+
+def test_missing_batch_route_falls_back_to_single_spawns():
+    standin = MissingBatchRoute(StandinConfig(latency=0.01, latency_dist="fixed"))
+
+    async def run():
+        async with serve(standin) as url:
+            results, runtime = await spawn_all(url)
+            return results, runtime, await standin_stats(url)
+
+    results, runtime, stats = asyncio.run(run())
+    assert all(r["success"] and r["tools"] for r in results)
+    assert runtime.batch_supported is False
+    assert stats["batches"] == 0
+    assert_all_released(stats, SERVERS)
+
+
+def test_late_batch_results_are_released():
+    async def run():
+        async with serve(fast_standin(latency=0.3)) as url:
+            async with RuntimeClient(
+                pool_size=4, base_url=url, batch_size=BATCH_SIZE
+            ) as runtime:
+                results = await asyncio.gather(
+                    *(
+                        runtime.spawn(f"server-{i}", spawn_config(i), timeout=0.05)
+                        for i in range(SERVERS)
+                    )
+                )
+            # Leaving the client waits for the batches still streaming
+            return results, await standin_stats(url)
+
+    results, stats = asyncio.run(run())
+    assert all(r["error_code"] == "TIMEOUT" for r in results)
+    assert_all_released(stats, SERVERS)
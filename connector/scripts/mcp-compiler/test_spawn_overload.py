@@ -0,0 +1,136 @@
+"""
+Overload signals from spawns against the local stand-in Runtime.
+
+A healthy Runtime with a few dead packages must not look overloaded: the
+dead packages time out on their own, and neither the AIMD limit nor the
+transport breaker may react to that. Likewise a slow cold start cut off by
+an adaptive timeout must not count against the server in the failure cache.
+
+Run from this directory:
+    python -m pytest -q test_spawn_overload.py
+"""
+
+import asyncio
+from pathlib import Path
+from typing import Any, Dict
+
+from breaker import BreakerRegistry
+from cache import SqliteCache
+from compiler import NEGATIVE_TIMEOUT_STRIKES, SpawnFailureCache, Spawner
+from concurrency import AIMDController
+from runtime_client import RuntimeClient
+from standin_runtime import StandinConfig, StandinRuntime
+from test_runtime_batch import serve, spawn_config
+from timeouts import AdaptiveTimeouts
+
+SERVERS = 48
+DEAD_EVERY = 8  # one dead package in eight
+SPAWN_TIMEOUT = 0.2
+
+
+class DeadPackages(StandinRuntime):
+    """Never answers in time for every DEAD_EVERY-th server."""
+
+    async def _spawn(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        index = int(item.get("serverId", "server-0").rsplit("-", 1)[1])
+        if index % DEAD_EVERY == 0:
+            self.stats["spawns"] += 1
+            await asyncio.sleep(SPAWN_TIMEOUT * 3)
+            return {"status": 500, "error": "Process never started"}
+        return await super()._spawn(item)
+
+
+def test_dead_packages_do_not_collapse_the_limit():
+    standin = DeadPackages(
+        StandinConfig(latency=0.01, latency_dist="fixed", batch=False, seed=0)
+    )
+    limiter = AIMDController(initial=8, floor=1, ceiling=16)
+    breakers = BreakerRegistry("spawn", 5, 120)
+
+    async def run():
+        async with serve(standin) as url:
+            async with RuntimeClient(pool_size=16, base_url=url) as runtime:
+                spawner = Spawner(
+                    runtime,
+                    limiter=limiter,
+                    breakers=breakers,
+                    timeouts=AdaptiveTimeouts(None, SPAWN_TIMEOUT),
+                )
+                results = await asyncio.gather(
+                    *(
+                        spawner.spawn(f"server-{i}", spawn_config(i))
+                        for i in range(SERVERS)
+                    )
+                )
+                await spawner.close()
+        return results
+
+    results = asyncio.run(run())
+    dead = [r for i, r in enumerate(results) if i % DEAD_EVERY == 0]
+    alive = [r for i, r in enumerate(results) if i % DEAD_EVERY]
+    assert all(r["error_code"] == "TIMEOUT" for r in dead)
+    assert all(r["success"] and r["tools"] for r in alive)
+    assert limiter.decreases == 0
+    assert limiter.limit >= 8
+    assert breakers.get("npx").available()
+
+
+class SlowColdStart(StandinRuntime):
+    """Takes longer than the adaptive limit, but well inside the default."""
+
+    async def _spawn(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        await asyncio.sleep(0.2)
+        return await super()._spawn(item)
+
+
+def test_adaptive_cutoffs_are_not_failure_strikes(tmp_path: Path):
+    standin = SlowColdStart(
+        StandinConfig(latency=0.0, latency_dist="fixed", batch=False, seed=0)
+    )
+    timeouts = AdaptiveTimeouts(None, default=2.0, minimum=0.05)
+    for _ in range(20):
+        timeouts.observe("npx", 0.01)
+    failures = SpawnFailureCache(SqliteCache(tmp_path / "cache.db", "failures"))
+    limiter = AIMDController(initial=8, floor=1, ceiling=16)
+
+    async def run():
+        async with serve(standin) as url:
+            async with RuntimeClient(pool_size=4, base_url=url) as runtime:
+                spawner = Spawner(
+                    runtime, failures=failures, limiter=limiter, timeouts=timeouts
+                )
+                results = []
+                for _ in range(NEGATIVE_TIMEOUT_STRIKES + 1):
+                    results.append(await spawner.spawn("server-1", spawn_config(1)))
+                await spawner.close()
+        return results
+
+    results = asyncio.run(run())
+    assert all(r["error_code"] == "TIMEOUT" and r["cutoff"] for r in results)
+    assert failures.lookup("server-1", spawn_config(1), "") is None
+    assert len(failures.cache) == 0
+    assert limiter.decreases == 0
+    assert "3 cut off" in timeouts.summary()["npx"]
+
+
+def test_cancelled_while_waiting_for_a_slot_returns_the_probe():
+    breakers = BreakerRegistry("spawn", 1, 0)
+    breaker = breakers.get("npx")
+    breaker.record(breaker.allow(), False)
+    limiter = AIMDController(initial=1, floor=1, ceiling=1)
+
+    async def run():
+        await limiter.acquire()
+        spawner = Spawner(None, limiter=limiter, breakers=breakers)
+        task = asyncio.ensure_future(
+            spawner._spawn_limited("server-1", spawn_config(1))
+        )
+        await asyncio.sleep(0)
+        assert not breaker.available()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        limiter.release(None)
+
+    asyncio.run(run())
+    assert breaker.available()
+    assert limiter.in_flight == 0
@@ -0,0 +1,123 @@
+"""
+Adaptive per-transport spawn timeouts.
+
+A single SPAWN_TIMEOUT has to cover a cold docker pull, so an http remote
+that is never going to answer also gets 90 s. Successful spawn latencies are
+kept in a log-bucketed histogram per transport, persisted in the sqlite
+cache across runs, and each attempt's timeout is the configured percentile
+of its transport plus headroom, bounded by [SPAWN_TIMEOUT_MIN, default].
+
+Only successful spawns are recorded: a timed-out spawn's latency is unknown,
+and counting it at the limit would pull the percentile up to the ceiling.
+A spawn cut off below the default is returned as a TIMEOUT marked
+``cutoff`` and counted per transport; only a timeout at the full default
+counts against the server in the failure cache. Slow cold starts are covered by the percentile and
+headroom, not by a second spawn; transports with fewer than MIN_SAMPLES
+successes keep the full default.
+"""
+
+import os
+import threading
+from typing import Dict, List, Optional
+
+from cache import SqliteCache
+
+SPAWN_TIMEOUT_PERCENTILE = float(os.environ.get("SPAWN_TIMEOUT_PERCENTILE", "0.99"))
+SPAWN_TIMEOUT_HEADROOM = float(os.environ.get("SPAWN_TIMEOUT_HEADROOM", "1.0"))
+SPAWN_TIMEOUT_MIN = float(os.environ.get("SPAWN_TIMEOUT_MIN", "10"))
+MIN_SAMPLES = 20  # per transport before its timeout is trusted
+MAX_SAMPLES = 5000  # counts are halved beyond this, so old runs fade out
+
+# Bucket upper bounds in seconds: 0.1s growing by 25% up to ~10 minutes
+BUCKET_BOUNDS: List[float] = [round(0.1 * 1.25**i, 3) for i in range(39)]
+
+
+class LatencyHistogram:
+    def __init__(self, counts: Optional[List[float]] = None):
+        self.counts = list(counts or [])
+        if len(self.counts) != len(BUCKET_BOUNDS):
+            self.counts = [0.0] * len(BUCKET_BOUNDS)
+
+    @property
+    def total(self) -> float:
+        return sum(self.counts)
+
+    def add(self, seconds: float):
+        for i, bound in enumerate(BUCKET_BOUNDS):
+            if seconds <= bound:
+                break
+        self.counts[i] += 1
+        if self.total > MAX_SAMPLES:
+            self.counts = [c / 2 for c in self.counts]
+
+    def percentile(self, q: float) -> float:
+        target = q * self.total
+        seen = 0.0
+        for bound, count in zip(BUCKET_BOUNDS, self.counts):
+            seen += count
+            if seen >= target:
+                return bound
+        return BUCKET_BOUNDS[-1]
+
+
+class AdaptiveTimeouts:
+    def __init__(
+        self,
+        store: Optional[SqliteCache],
+        default: float,
+        percentile: float = SPAWN_TIMEOUT_PERCENTILE,
+        headroom: float = SPAWN_TIMEOUT_HEADROOM,
+        minimum: float = SPAWN_TIMEOUT_MIN,
+    ):
+        self.store = store
+        self.default = default
+        self.percentile = percentile
+        self.headroom = headroom
+        self.minimum = min(minimum, default)
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self._cutoffs: Dict[str, int] = {}
+
+    def _histogram(self, transport: str) -> LatencyHistogram:
+        histogram = self._histograms.get(transport)
+        if histogram is None:
+            stored = self.store.get(transport) if self.store is not None else None
+            histogram = self._histograms[transport] = LatencyHistogram(stored)
+        return histogram
+
+    def timeout_for(self, transport: str) -> float:
+        with self._lock:
+            histogram = self._histogram(transport)
+            if histogram.total < MIN_SAMPLES:
+                return self.default
+            limit = histogram.percentile(self.percentile) * (1 + self.headroom)
+        return min(self.default, max(self.minimum, limit))
+
+    def observe(self, transport: str, seconds: float):
+        with self._lock:
+            self._histogram(transport).add(seconds)
+
+    def record_cutoff(self, transport: str):
+        with self._lock:
+            self._cutoffs[transport] = self._cutoffs.get(transport, 0) + 1
+
+    def save(self):
+        if self.store is None:
+            return
+        with self._lock:
+            snapshot = {t: list(h.counts) for t, h in self._histograms.items()}
+        for transport, counts in snapshot.items():
+            self.store.put(transport, counts)
+
+    def summary(self) -> Dict[str, str]:
+        with self._lock:
+            transports = {t: h.total for t, h in self._histograms.items()}
+            cutoffs = dict(self._cutoffs)
+        return {
+            transport: (
+                f"timeout {self.timeout_for(transport):.1f}s "
+                f"from {total:.0f} samples, "
+                f"{cutoffs.get(transport, 0)} cut off"
+            )
+            for transport, total in sorted(transports.items())
+        }